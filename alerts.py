@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import queue
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# INCREMENTAL ALERTING (threshold, streak and transition rules on each append)
+# -----------------------------------------------------------------------------
+# The engine never rescans history. Per district it keeps a handful of numbers:
+# the last date seen, the last risk label, the current breach streak of every
+# rule and when each rule last fired. A new batch is evaluated with array
+# operations over all its rows; only the (rare) candidate alerts are looped over
+# for rate limiting.
+
+RISK_NAMES = {0: 'Safe', 1: 'Warning', 2: 'Critical'}
+
+OPS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+}
+
+
+class AlertRule:
+    """Fires when `column op threshold` has held for `days` consecutive days (days=1: on crossing)."""
+
+    def __init__(self, name, column, op, threshold, days=1, severity='warning', message=''):
+        self.name = name
+        self.column = column
+        self.op = op
+        self.threshold = threshold
+        self.days = days
+        self.severity = severity
+        self.message = message
+
+
+DEFAULT_RULES = [
+    AlertRule('reservoir_low', 'Reservoir_Level_pct', '<', 25, severity='critical',
+              message="Reservoir storage fell below 25% ({value:.1f}%)."),
+    AlertRule('groundwater_decline', 'Net_GW_Change_MLD', '<', -5,
+              message="Net groundwater change is {value:.1f} MLD (below -5 MLD)."),
+]
+
+# Evaluated on the precomputed forecast (one row per district and snapshot date, see
+# forecast_rows) by a separate engine, since a snapshot shares its date with the
+# last observed day
+FORECAST_RULES = [
+    AlertRule('forecast_deficit_streak', 'Forecast_Deficit_Days', '>=', 7,
+              message="Projected water gap is negative for {value:.0f} consecutive days of the forecast."),
+]
+
+
+class QueueSink:
+    """In-process sink: alerts are put on a queue.Queue for a notifier thread."""
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def write(self, alerts):
+        for alert in alerts:
+            self.queue.put(alert)
+
+
+class JsonlFileSink:
+    """Appends one JSON object per alert to a file; consumers tail it with read_alerts."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, alerts):
+        if not alerts:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(alert) + '\n' for alert in alerts))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_alerts(path, offset=0):
+    """Reads alerts appended after byte `offset`; returns (alerts, new_offset) so a notifier can resume."""
+    if not os.path.exists(path):
+        return [], offset
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    # Only consume complete lines; a partially written one is picked up next time
+    complete = data[:data.rfind(b'\n') + 1]
+    alerts = [json.loads(line) for line in complete.decode('utf-8').splitlines() if line]
+    return alerts, offset + len(complete)
+
+
+def _streaks(breach, group_start, carry):
+    """Consecutive-breach count at every row, continuing each group's carried count."""
+    pos = np.arange(len(breach))
+    last_reset = np.maximum.accumulate(np.where(~breach, pos, -1))
+    unbroken = last_reset < group_start
+    return np.where(unbroken, carry + pos - group_start + 1, pos - last_reset)
+
+
+def forecast_deficit_days(gaps):
+    """Longest run of consecutive negative days in each row of an (n_units, horizon) gap projection."""
+    n, horizon = gaps.shape
+    group_start = np.repeat(np.arange(n) * horizon, horizon)
+    streak = _streaks(np.asarray(gaps).ravel() < 0, group_start, 0)
+    return streak.reshape(n, horizon).max(axis=1, initial=0)
+
+
+def forecast_rows(districts, dates, gaps):
+    """Rows for FORECAST_RULES: each district's forecast deficit streak as of its snapshot date."""
+    return pd.DataFrame({
+        'District': districts,
+        'Date': pd.to_datetime(dates),
+        'Forecast_Deficit_Days': forecast_deficit_days(gaps),
+    })
+
+
+class AlertEngine:
+    """Evaluates alert rules incrementally on appended daily rows, keeping O(1) state per district."""
+
+    def __init__(self, rules=DEFAULT_RULES, sinks=(), cooldown_days=7, unit_col='District', risk_col='Risk_Label'):
+        self.rules = list(rules)
+        self.sinks = list(sinks)
+        self.cooldown = pd.Timedelta(days=cooldown_days)
+        self.unit_col = unit_col
+        self.risk_col = risk_col
+        # unit -> {'last_date', 'risk', 'streak': {rule: n}, 'fired': {rule: date}}
+        self.state = {}
+
+    def _unit_state(self, unit):
+        if unit not in self.state:
+            self.state[unit] = {'last_date': None, 'risk': None, 'streak': {}, 'fired': {}}
+        return self.state[unit]
+
+    def process(self, batch):
+        """Evaluates a batch of new rows (any districts, any number of days) and emits alerts."""
+        unit_col = self.unit_col
+        batch = batch.sort_values([unit_col, 'Date'], kind='stable', ignore_index=True)
+
+        # Idempotent appends: rows at or before a unit's last processed date are ignored
+        units = batch[unit_col].to_numpy()
+        last_dates = pd.to_datetime(pd.Series(units).map(
+            lambda u: self.state.get(u, {}).get('last_date')))
+        fresh = last_dates.isna().to_numpy() | (batch['Date'] > last_dates).to_numpy()
+        batch = batch[fresh].reset_index(drop=True)
+        if batch.empty:
+            return []
+        units = batch[unit_col].to_numpy()
+        dates = batch['Date'].to_numpy()
+
+        first = np.ones(len(batch), dtype=bool)
+        first[1:] = units[1:] != units[:-1]
+        starts = np.flatnonzero(first)
+        lengths = np.diff(np.append(starts, len(batch)))
+        group_start = np.repeat(starts, lengths)
+        ends = starts + lengths - 1
+        unit_states = [self._unit_state(u) for u in units[starts]]
+
+        candidates = []
+        for rule in self.rules:
+            if rule.column not in batch:
+                continue
+            values = batch[rule.column].to_numpy(dtype=float)
+            breach = OPS[rule.op](values, rule.threshold)
+            carry = np.repeat([s['streak'].get(rule.name, 0) for s in unit_states], lengths)
+            streak = _streaks(breach, group_start, carry)
+            for i in np.flatnonzero(streak == rule.days):
+                candidates.append((i, rule.name, rule.severity, rule.message.format(value=values[i]), values[i]))
+            for s, end in zip(unit_states, ends):
+                s['streak'][rule.name] = int(streak[end])
+
+        # Risk escalation: the label rises above the previous day's
+        if self.risk_col in batch:
+            risk = batch[self.risk_col].to_numpy()
+            prev = np.empty_like(risk)
+            prev[1:] = risk[:-1]
+            carried = np.array([-1 if s['risk'] is None else s['risk'] for s in unit_states])
+            prev[starts] = carried
+            for i in np.flatnonzero((risk > prev) & (prev >= 0)):
+                message = f"Drought risk escalated from {RISK_NAMES.get(prev[i])} to {RISK_NAMES.get(risk[i])}."
+                severity = 'critical' if risk[i] == 2 else 'warning'
+                candidates.append((i, 'risk_escalation', severity, message, risk[i]))
+            for s, end in zip(unit_states, ends):
+                s['risk'] = int(risk[end])
+
+        for s, end in zip(unit_states, ends):
+            s['last_date'] = pd.Timestamp(dates[end])
+
+        alerts = self._rate_limit(sorted(candidates, key=lambda c: c[0]), units, dates)
+        for sink in self.sinks:
+            sink.write(alerts)
+        return alerts
+
+    def _rate_limit(self, candidates, units, dates):
+        alerts = []
+        for i, rule, severity, message, value in candidates:
+            unit, date = units[i], pd.Timestamp(dates[i])
+            fired = self.state[unit]['fired']
+            if rule in fired and date - fired[rule] < self.cooldown:
+                continue
+            fired[rule] = date
+            alerts.append({
+                'id': f"{rule}:{unit}:{date:%Y-%m-%d}",
+                'rule': rule,
+                'severity': severity,
+                'district': str(unit),
+                'date': f"{date:%Y-%m-%d}",
+                'value': float(value),
+                'message': message,
+            })
+        return alerts
+
+    def save_state(self, path):
+        """Persists per-district state so a restarted engine continues where it stopped."""
+        def encode(s):
+            return {
+                'last_date': None if s['last_date'] is None else f"{s['last_date']:%Y-%m-%d}",
+                'risk': s['risk'],
+                'streak': s['streak'],
+                'fired': {rule: f"{date:%Y-%m-%d}" for rule, date in s['fired'].items()},
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({unit: encode(s) for unit, s in self.state.items()}, f)
+
+    def load_state(self, path):
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+        self.state = {
+            unit: {
+                'last_date': None if s['last_date'] is None else pd.Timestamp(s['last_date']),
+                'risk': s['risk'],
+                'streak': s['streak'],
+                'fired': {rule: pd.Timestamp(date) for rule, date in s['fired'].items()},
+            }
+            for unit, s in saved.items()
+        }
+
+
+if __name__ == "__main__":
+    import water_data
+
+    parser = argparse.ArgumentParser(description="Replay the synthetic dataset through the alert engine, one day per append.")
+    parser.add_argument('--output', default='alerts.jsonl')
+    parser.add_argument('--state', default='alert_state.json')
+    parser.add_argument('--cooldown-days', type=int, default=7)
+    parser.add_argument('--snapshot', help="also evaluate the forecast rules on this snapshot (.npz)")
+    args = parser.parse_args()
+
+    engine = AlertEngine(sinks=[JsonlFileSink(args.output)], cooldown_days=args.cooldown_days)
+    if os.path.exists(args.state):
+        engine.load_state(args.state)
+    df = water_data.generate_synthetic_data()
+    total = 0
+    for _, day in df.groupby('Date', sort=True):
+        total += len(engine.process(day))
+    engine.save_state(args.state)
+    if args.snapshot:
+        with np.load(args.snapshot) as snapshot:
+            rows = forecast_rows(snapshot['districts'], snapshot['data_date'], snapshot['gap'])
+        forecast_engine = AlertEngine(FORECAST_RULES, [JsonlFileSink(args.output)], args.cooldown_days)
+        total += len(forecast_engine.process(rows))
+    print(f"Emitted {total} alerts to {args.output}")
@@ -0,0 +1,190 @@
+import argparse
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.ensemble import IsolationForest
+
+from rolling import unit_positions
+
+# -----------------------------------------------------------------------------
+# ANOMALY DETECTION (robust rolling and seasonal-residual scores per stream)
+# -----------------------------------------------------------------------------
+# The stress and risk rules only see fixed thresholds, so a stuck gauge or a sudden
+# drop that stays inside them goes unnoticed. Each monitored stream is scored two
+# ways, for every district and every stream in one array pass:
+#   * robust z  - distance from the median of the previous ANOMALY_WINDOW days,
+#                 in units of their median absolute deviation;
+#   * seasonal z - distance from the district's mean for that calendar month,
+#                 in units of that month's standard deviation.
+# A reading is anomalous when it is unusual on both counts. State between batches
+# is the last few rows of each district plus per-(district, month) running sums,
+# so new data is scored without rescanning history. Seasonal statistics only ever
+# include rows up to the one being scored, however the history is batched.
+
+ANOMALY_WINDOW = 30
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+
+# column -> (signal, minimum scale). Storage levels are scored on their daily change,
+# since a level is smooth and only a jump in it is suspicious. The minimum scale
+# keeps a flat stretch (e.g. dry-season rainfall, all zeros) from making any
+# small reading look extreme.
+STREAMS = {
+    'Rainfall_mm': ('value', 5.0),
+    'Groundwater_Level_mbgl': ('change', 0.1),
+    'Reservoir_Level_pct': ('change', 1.0),
+    'Water_Demand_MLD': ('value', 5.0),
+}
+
+ROBUST_Z = 5.0
+SEASONAL_Z = 3.0
+
+
+def rolling_robust_z(signal, position, window=ANOMALY_WINDOW, min_scale=0.0):
+    """
+    Robust z-score of every row of `signal` (n_rows, n_streams) against the previous
+    `window` rows of its unit. `position` is each row's index within its unit (rows
+    sorted by unit, then time); rows without a full window of history get NaN.
+    """
+    n = len(signal)
+    z = np.full(signal.shape, np.nan)
+    if n <= window:
+        return z
+    # windows[j] covers rows j .. j + window - 1, i.e. the history of row j + window
+    windows = sliding_window_view(signal[:-1], window, axis=0)
+    median = np.median(windows, axis=-1)
+    mad = np.median(np.abs(windows - median[..., None]), axis=-1)
+    scale = np.maximum(mad * MAD_SCALE, min_scale)
+    z[window:] = (signal[window:] - median) / scale
+    # A window that reaches back into the previous unit is not history
+    z[position < window] = np.nan
+    return z
+
+
+class AnomalyDetector:
+    """Scores appended daily rows for anomalies; keeps a short tail and monthly sums per unit."""
+
+    def __init__(self, streams=STREAMS, window=ANOMALY_WINDOW, robust_z=ROBUST_Z, seasonal_z=SEASONAL_Z,
+                 unit_col='District', isolation_forest=False, contamination=0.002, random_state=42):
+        self.streams = streams
+        self.columns = list(streams)
+        self.window = window
+        self.robust_z = robust_z
+        self.seasonal_z = seasonal_z
+        self.unit_col = unit_col
+        self.min_scale = np.array([s[1] for s in streams.values()])
+        self.is_change = np.array([s[0] == 'change' for s in streams.values()])
+        # Optional second opinion: an IsolationForest fitted on the first batch's scores
+        self.isolation_forest = isolation_forest
+        self.contamination = contamination
+        self.random_state = random_state
+        self.forest = None
+        self.tail = None
+        self.units = {}
+        # (unit, month, stream) running count, sum and sum of squares of the signal
+        self.clim = np.zeros((0, 12, len(streams), 3))
+
+    def _unit_ids(self, units):
+        for unit in pd.unique(units):
+            if unit not in self.units:
+                self.units[unit] = len(self.units)
+        if len(self.units) > len(self.clim):
+            grown = np.zeros((len(self.units),) + self.clim.shape[1:])
+            grown[:len(self.clim)] = self.clim
+            self.clim = grown
+        return pd.Series(units).map(self.units).to_numpy()
+
+    def process(self, batch):
+        """
+        Scores a batch of new rows (any units, in date order within each unit).
+        Returns one row per input row: Date, unit, the robust and seasonal z of every
+        stream, a per-stream flag, Anomaly_Score (>= 1 means anomalous) and Anomaly.
+        """
+        unit_col, cols = self.unit_col, self.columns
+        frame = batch[['Date', unit_col] + cols].assign(_new=True)
+        if self.tail is not None:
+            frame = pd.concat([self.tail.assign(_new=False), frame], ignore_index=True)
+        frame = frame.sort_values(unit_col, kind='stable', ignore_index=True)
+        # One extra row, so the first change in the next window is defined
+        self.tail = frame.groupby(unit_col, sort=False).tail(self.window + 1)[['Date', unit_col] + cols]
+        self.tail = self.tail.reset_index(drop=True)
+
+        units = frame[unit_col].to_numpy()
+        first = np.ones(len(frame), dtype=bool)
+        first[1:] = units[1:] != units[:-1]
+        position = unit_positions(units)
+
+        values = frame[cols].to_numpy(dtype=float)
+        signal = values.copy()
+        change = np.diff(values, axis=0, prepend=np.nan)
+        change[first] = np.nan
+        signal[:, self.is_change] = change[:, self.is_change]
+
+        robust = rolling_robust_z(signal, position, self.window, self.min_scale)
+
+        # Seasonal residuals: each row is scored against the monthly sums up to and
+        # including itself (earlier batches plus the batch's rows so far), so one big
+        # batch scores exactly like the same rows appended a day at a time
+        new = frame['_new'].to_numpy()
+        uid = self._unit_ids(units)
+        month = frame['Date'].dt.month.to_numpy() - 1
+        known = new[:, None] & ~np.isnan(signal)
+        x = np.where(known, signal, 0.0)
+        n_streams = len(cols)
+        running = pd.DataFrame(np.hstack([known, x, x * x])).groupby(uid * 12 + month, sort=False).cumsum().to_numpy()
+        before = self.clim[uid, month]
+        count, total, squares = (before[..., i] + running[:, i * n_streams:(i + 1) * n_streams] for i in range(3))
+        for k in range(n_streams):
+            rows = known[:, k]
+            np.add.at(self.clim, (uid[rows], month[rows], k, 0), 1)
+            np.add.at(self.clim, (uid[rows], month[rows], k, 1), signal[rows, k])
+            np.add.at(self.clim, (uid[rows], month[rows], k, 2), signal[rows, k] ** 2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+            std = np.sqrt(np.maximum(squares / count - mean ** 2, 0))
+            seasonal = (signal - mean) / np.maximum(std, self.min_scale)
+
+        robust, seasonal = robust[new], seasonal[new]
+        frame = frame[new].reset_index(drop=True)
+        # Per-stream score: unusual both against recent days and against the season
+        with np.errstate(invalid='ignore'):
+            stream_score = np.minimum(np.abs(robust) / self.robust_z, np.abs(seasonal) / self.seasonal_z)
+        stream_score = np.nan_to_num(stream_score)
+
+        out = frame[['Date', unit_col]].copy()
+        for k, col in enumerate(cols):
+            out[f'{col}_robust_z'] = robust[:, k]
+            out[f'{col}_seasonal_z'] = seasonal[:, k]
+            out[f'{col}_anomaly'] = stream_score[:, k] >= 1
+        out['Anomaly_Score'] = stream_score.max(axis=1)
+        out['Anomaly'] = out['Anomaly_Score'] >= 1
+
+        if self.isolation_forest and len(out):
+            features = np.nan_to_num(np.hstack([robust, seasonal]))
+            if self.forest is None:
+                self.forest = IsolationForest(contamination=self.contamination, random_state=self.random_state)
+                self.forest.fit(features)
+            out['Isolation_Score'] = -self.forest.score_samples(features)
+            out['Anomaly'] |= self.forest.predict(features) == -1
+        return out
+
+
+def summarize(scores, columns=None, unit_col='District'):
+    """Anomalous days per unit and stream."""
+    columns = list(STREAMS) if columns is None else columns
+    counts = scores.groupby(unit_col, sort=False)[[f'{c}_anomaly' for c in columns] + ['Anomaly']].sum()
+    counts.columns = columns + ['any']
+    return counts
+
+
+if __name__ == "__main__":
+    import water_data
+
+    parser = argparse.ArgumentParser(description="Replay the synthetic dataset through the anomaly detector.")
+    parser.add_argument('--freq', default='QS', help="append size, as a pandas frequency (default: one quarter)")
+    parser.add_argument('--isolation-forest', action='store_true', help="also flag IsolationForest outliers")
+    args = parser.parse_args()
+
+    detector = AnomalyDetector(isolation_forest=args.isolation_forest)
+    scores = pd.concat([detector.process(part) for part in water_data.iter_raw_partitions(freq=args.freq)],
+                       ignore_index=True)
+    print(summarize(scores).to_string())
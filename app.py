@@ -3,11 +3,26 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, mean_absolute_error, classification_report
-from datetime import datetime, timedelta
+from sklearn.metrics import classification_report
+from datetime import timedelta
 import warnings
+import os
+import tempfile
+
+from versioning import data_fingerprint, model_fingerprint
+from explainability import explain_latest
+from diagnostics import DiagnosticsRunner
+from figure_cache import FigureCache
+from hierarchy import SAURASHTRA, LEVELS
+import water_data
+from spatial import regional_grid, idw_interpolate, surface_to_png
+from alerts import FORECAST_RULES, AlertEngine, forecast_rows
+from anomalies import AnomalyDetector
+from validation import DataValidator
+from snapshots import SnapshotStore, build_snapshot, forecast_gaps
+import resampling
+import shared_data
+import model_refresh
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
@@ -44,6 +59,14 @@ TRANSLATIONS = {
         'English': 'Training AI Models...',
         'Gujarati': 'AI મોડલ્સ તાલીમ પામી રહ્યા છે...'
     },
+    'models_refreshed': {
+        'English': '🔄 Models refreshed with the latest data',
+        'Gujarati': '🔄 મોડલ્સ નવીનતમ ડેટા સાથે અપડેટ થયા'
+    },
+    'models_retrained': {
+        'English': '🔁 Recent accuracy dropped - models retrained on the full history',
+        'Gujarati': '🔁 તાજેતરની ચોકસાઈ ઘટી - મોડલ્સ સમગ્ર ઇતિહાસ પર ફરી તાલીમ પામ્યા'
+    },
     'avg_rainfall': {
         'English': 'Avg Rainfall (30d)',
         'Gujarati': 'સરેરાશ વરસાદ (30 દિવસ)'
@@ -124,6 +147,46 @@ TRANSLATIONS = {
         'English': 'Drought Risk Factors (Global Importance)',
         'Gujarati': 'દુષ્કાળ જોખમ પરિબળો (વૈશ્વિક મહત્વ)'
     },
+    'why_district': {
+        'English': '#### Why is {district} rated this way today?',
+        'Gujarati': '#### આજે {district} ને આ રેટિંગ શા માટે મળ્યું?'
+    },
+    'risk_waterfall': {
+        'English': 'Contribution to {label} probability',
+        'Gujarati': '{label} સંભાવનામાં યોગદાન'
+    },
+    'gap_waterfall': {
+        'English': 'Contribution to predicted Water Gap (MLD)',
+        'Gujarati': 'અંદાજિત જળ ખાધ (MLD) માં યોગદાન'
+    },
+    'baseline': {
+        'English': 'Baseline',
+        'Gujarati': 'આધારરેખા'
+    },
+    'prediction': {
+        'English': 'Prediction',
+        'Gujarati': 'અનુમાન'
+    },
+    'perm_importance': {
+        'English': 'Drought Risk Factors (Permutation Importance)',
+        'Gujarati': 'દુષ્કાળ જોખમ પરિબળો (પરમ્યુટેશન મહત્વ)'
+    },
+    'pdp_feature': {
+        'English': 'Partial dependence for',
+        'Gujarati': 'આંશિક નિર્ભરતા માટે'
+    },
+    'pdp_title': {
+        'English': 'How {feature} shifts risk probability and water gap',
+        'Gujarati': '{feature} જોખમ સંભાવના અને જળ ખાધને કેવી રીતે બદલે છે'
+    },
+    'diag_running': {
+        'English': 'Computing model diagnostics in the background... {pct}%',
+        'Gujarati': 'પૃષ્ઠભૂમિમાં મોડેલ નિદાન ગણાઈ રહ્યું છે... {pct}%'
+    },
+    'diag_failed': {
+        'English': 'Model diagnostics failed: {error}',
+        'Gujarati': 'મોડેલ નિદાન નિષ્ફળ: {error}'
+    },
     'interpretation': {
         'English': '**Interpretation:**',
         'Gujarati': '**અર્થઘટન:**'
@@ -144,6 +207,82 @@ TRANSLATIONS = {
         'English': 'Regional Risk Heatmap',
         'Gujarati': 'પ્રાદેશિક જોખમ હીટમેપ'
     },
+    'map_level': {
+        'English': 'Spatial level',
+        'Gujarati': 'અવકાશી સ્તર'
+    },
+    'level_district': {
+        'English': 'District',
+        'Gujarati': 'જિલ્લો'
+    },
+    'level_taluka': {
+        'English': 'Taluka',
+        'Gujarati': 'તાલુકો'
+    },
+    'level_village': {
+        'English': 'Village',
+        'Gujarati': 'ગામ'
+    },
+    'only_district': {
+        'English': 'Only {district}',
+        'Gujarati': 'માત્ર {district}'
+    },
+    'map_layer': {
+        'English': 'Map layer',
+        'Gujarati': 'નકશા સ્તર'
+    },
+    'layer_points': {
+        'English': 'Risk points',
+        'Gujarati': 'જોખમ બિંદુઓ'
+    },
+    'layer_Risk_Score': {
+        'English': 'Risk score heatmap (0 = Safe, 2 = Critical)',
+        'Gujarati': 'જોખમ સ્કોર હીટમેપ (0 = સુરક્ષિત, 2 = ગંભીર)'
+    },
+    'layer_Gap_Intensity_MLD': {
+        'English': 'Water gap heatmap (district-equivalent MLD)',
+        'Gujarati': 'જળ ખાધ હીટમેપ (જિલ્લા-સમકક્ષ MLD)'
+    },
+    'layer_Groundwater_Level_mbgl': {
+        'English': 'Groundwater depth heatmap (mbgl)',
+        'Gujarati': 'ભૂગર્ભજળ ઊંડાઈ હીટમેપ (mbgl)'
+    },
+    'hourly_zoom': {
+        'English': 'Zoom to hourly telemetry',
+        'Gujarati': 'કલાકદીઠ ટેલિમેટ્રી જુઓ'
+    },
+    'zoom_window': {
+        'English': 'Date range (up to 31 days)',
+        'Gujarati': 'તારીખ શ્રેણી (31 દિવસ સુધી)'
+    },
+    'hourly_title': {
+        'English': 'Hourly Rainfall, Reservoir and Groundwater',
+        'Gujarati': 'કલાકદીઠ વરસાદ, જળાશય અને ભૂગર્ભજળ'
+    },
+    'alerts_title': {
+        'English': '🚨 Recent Alerts',
+        'Gujarati': '🚨 તાજેતરની ચેતવણીઓ'
+    },
+    'no_alerts': {
+        'English': 'No alerts for this district.',
+        'Gujarati': 'આ જિલ્લા માટે કોઈ ચેતવણી નથી.'
+    },
+    'anomaly_marker': {
+        'English': 'Anomaly',
+        'Gujarati': 'અસામાન્યતા'
+    },
+    'anomalies_caption': {
+        'English': '⚠️ Unusual readings in the last 90 days: {items}',
+        'Gujarati': '⚠️ છેલ્લા 90 દિવસમાં અસામાન્ય રીડિંગ: {items}'
+    },
+    'quality_caption': {
+        'English': '🧪 Data quality: {passed} of {rows} hourly readings passed, {quarantined} quarantined, {gaps} missing hours',
+        'Gujarati': '🧪 ડેટા ગુણવત્તા: {rows} માંથી {passed} કલાકદીઠ રીડિંગ પાસ, {quarantined} અલગ કરાયા, {gaps} ખૂટતા કલાક'
+    },
+    'units_at_risk': {
+        'English': '{critical} of {total} units predicted Critical',
+        'Gujarati': '{total} માંથી {critical} એકમો ગંભીર અનુમાનિત'
+    },
     'lang_label': {
         'English': 'Language / ભાષા',
         'Gujarati': 'Language / ભાષા'
@@ -457,249 +596,527 @@ st.markdown("""
 # -----------------------------------------------------------------------------
 # 2. SYNTHETIC DATA GENERATION (Simulating Saurashtra Region)
 # -----------------------------------------------------------------------------
-@st.cache_data
-def generate_synthetic_data():
-    """Generates realistic synthetic data for Saurashtra districts with groundwater dynamics."""
-    districts = ['Rajkot', 'Jamnagar', 'Junagadh', 'Amreli', 'Bhavnagar', 'Porbandar', 'Morbi', 'Dwarka']
-    
-    # GROUNDWATER CONSTANTS (MLD per borewell unit)
-    AVG_RECHARGE_RATE = 0.05 
-    AVG_EXTRACTION_RATE = 0.12
-    
-    # Generate dates from 2020 to 2025 as requested
-    start_date = datetime(2020, 1, 1)
-    end_date = datetime(2025, 12, 31)
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    data = []
-    
-    for district in districts:
-        # Base climate profile per district (simplification)
-        if district in ['Junagadh', 'Amreli']:
-            base_rain = 600
-            extraction_wells = np.random.randint(150, 300)
-            recharge_wells = np.random.randint(50, 100)
-        else:
-            base_rain = 450 # Drier parts
-            extraction_wells = np.random.randint(300, 500)
-            recharge_wells = np.random.randint(20, 60)
-            
-        for date in dates:
-            month = date.month
-            
-            # Monsoon Season Logic (June-Sept)
-            is_monsoon = 6 <= month <= 9
-            
-            # Rainfall Simulation (mm)
-            if is_monsoon:
-                daily_rain = np.random.gamma(shape=2, scale=10) if np.random.rand() > 0.3 else 0
-            else:
-                daily_rain = np.random.gamma(shape=1, scale=2) if np.random.rand() > 0.9 else 0
-            
-            # Temperature (C)
-            base_temp = 30
-            if 3 <= month <= 5: # Summer
-                temp = base_temp + np.random.normal(5, 2)
-            elif 11 <= month <= 1: # Winter
-                temp = base_temp - np.random.normal(8, 2)
-            else:
-                temp = base_temp + np.random.normal(0, 2)
-                
-            # Groundwater Level (meters below ground level - mbgl)
-            # More rain -> lower mbgl (closer to surface). Less rain -> higher mbgl (deeper)
-            # Simple interaction: Accumulate rain effect with decay
-            
-            # Reservoir Level (%) - strongly correlated with seasonal rain
-            if is_monsoon:
-                res_level = 40 + np.random.normal(30, 10) # Fills up
-            else:
-                res_level = 40 - ((date.dayofyear % 365) / 365 * 30) # Depletes
-            res_level = max(0, min(100, res_level))
-            
-            # Groundwater (random walk with drift based on season)
-            gw_level = 15 + (np.sin(date.dayofyear / 365 * 2 * np.pi) * 5) + np.random.normal(0, 0.5)
-            gw_level = max(2, gw_level) # Cannot be negative
-            
-            # Demand (MLD) - Higher in summer
-            base_demand = 200 if district in ['Rajkot', 'Bhavnagar'] else 100
-            demand_fluctuation = 1.2 if 3 <= month <= 5 else 1.0
-            water_demand = base_demand * demand_fluctuation + np.random.normal(0, 5)
-            
-            # Append basic attributes
-            data.append({
-                'Date': date,
-                'District': district,
-                'Rainfall_mm': round(daily_rain, 1),
-                'Temperature_C': round(temp, 1),
-                'Groundwater_Level_mbgl': round(gw_level, 2),
-                'Reservoir_Level_pct': round(res_level, 1),
-                'Water_Demand_MLD': round(water_demand, 1),
-                'extraction_borewells': extraction_wells,
-                'recharge_borewells': recharge_wells
-            })
-            
-    df = pd.DataFrame(data)
-    
-    # Feature Engineering Loop
-    df['Month'] = df['Date'].dt.month
-    
-    # 30-day rolling averages for trends
-    df['Rain_30d_Avg'] = df.groupby('District')['Rainfall_mm'].transform(lambda x: x.rolling(30).mean())
-    df['Temp_30d_Avg'] = df.groupby('District')['Temperature_C'].transform(lambda x: x.rolling(30).mean())
-    
-    # Lag features for forecasting
-    df['Rain_Lag1'] = df.groupby('District')['Rainfall_mm'].shift(1)
-    df['Rain_Lag7'] = df.groupby('District')['Rainfall_mm'].shift(7)
-    
-    # GROUNDWATER DYNAMICS CALCULATION
-    # --------------------------------
-    # Natural Recharge (heuristic based on 30d rain)
-    df['Natural_Recharge_MLD'] = df['Rain_30d_Avg'] * 1.5
-    
-    # Artificial Recharge
-    df['Artificial_Recharge_MLD'] = df['recharge_borewells'] * AVG_RECHARGE_RATE
-    
-    # Extraction
-    df['Extraction_MLD'] = df['extraction_borewells'] * AVG_EXTRACTION_RATE
-    
-    # Net Groundwater Change
-    df['Net_GW_Change_MLD'] = df['Natural_Recharge_MLD'] + df['Artificial_Recharge_MLD'] - df['Extraction_MLD']
-
-    # Groundwater Stress Classification
-    def classify_gw_stress(row):
-        depth = row['Groundwater_Level_mbgl']
-        net_change = row['Net_GW_Change_MLD']
-        ext = row['extraction_borewells']
-        rech = row['recharge_borewells']
-        
-        # Rules
-        if depth < 12 and net_change >= 0:
-            status = "Safe"
-            explain = f"Groundwater levels are healthy. Natural and artificial recharge ({rech} wells) are successfully balancing the extraction ({ext} wells)."
-        elif depth > 20 and net_change < -5:
-            status = "Critical"
-            explain = f"Critical stress detected! Extremely high extraction ({ext} wells) is far outpacing recharge, and the water table is dangerously deep at {depth} mbgl."
-        else:
-            status = "Warning"
-            explain = f"Groundwater warning. The extraction rate is high, and recharge mechanisms ({rech} wells) are barely keeping up with demand."
-            
-        return pd.Series([status, explain])
+# Files the dashboard keeps on disk (hourly telemetry, snapshots); overridable so a
+# test run never touches a live deployment's files
+DATA_DIR = os.environ.get('SAURASHTRA_DATA_DIR') or tempfile.gettempdir()
+# Native-resolution (hourly) telemetry lives on disk, one file per dataset version
+# (see telemetry_path); only the daily view is held in memory
+TELEMETRY_DIR = DATA_DIR
+MAX_ZOOM_DAYS = 31
+# Precomputed per-district risk and forecasts, refreshed whenever data or models change
+SNAPSHOT_PATH = os.path.join(DATA_DIR, 'saurashtra_snapshot.npz')
+# The enriched dataset is built once per host and shared (read-only, memory-mapped)
+# by every server process; after this many seconds the next process rebuilds it.
+# Its ingest quality report is published with it, under the same version.
+SHARED_DATA_NAME = shared_data.configured_name('saurashtra')
+SHARED_DATA_MAX_AGE = 12 * 3600
 
-    df[['groundwater_status', 'groundwater_explanation']] = df.apply(classify_gw_stress, axis=1)
 
-    # Supply estimation (simplified physics: Rain + GW + Reservoir proxy)
-    # This is a heuristic for the model to learn
-    df['Estimated_Supply_MLD'] = (df['Rain_30d_Avg'] * 2) + (100 - df['Groundwater_Level_mbgl']) * 2 + (df['Reservoir_Level_pct'] * 1.5)
-    
-    # Target Variable 1: Gap (Supply - Demand)
-    df['Water_Gap_MLD'] = df['Estimated_Supply_MLD'] - df['Water_Demand_MLD']
-    
-    # Target Variable 2: Drought Risk (Classification)
-    conditions = [
-        (df['Reservoir_Level_pct'] < 25) | ((df['Rain_30d_Avg'] < 2) & (df['Groundwater_Level_mbgl'] > 18)),
-        (df['Reservoir_Level_pct'] < 50) & (df['Water_Gap_MLD'] < 0),
-    ]
-    choices = ['Critical', 'Warning']
-    df['Risk_Category'] = np.select(conditions, choices, default='Safe')
-    df['Risk_Label'] = df['Risk_Category'].map({'Safe': 0, 'Warning': 1, 'Critical': 2})
+def telemetry_path(data_version):
+    """Hourly store that belongs to one dataset version, so every process zooms into its own daily view."""
+    return os.path.join(TELEMETRY_DIR, f'{SHARED_DATA_NAME}_telemetry-{data_version}.parquet')
+
+
+def build_dataset():
+    """
+    Generates realistic synthetic data for Saurashtra districts with groundwater dynamics.
+    Returns the dataset and, to publish with it, the ingest quality report.
+    """
+    # District list, coordinates and borewell counts come from the spatial hierarchy.
+    # Telemetry is ingested hourly and resampled; the daily models run on the daily view.
+    validator = DataValidator(freq='h')
+    staging = os.path.join(TELEMETRY_DIR, f'{SHARED_DATA_NAME}_telemetry.{os.getpid()}.parquet')
+    try:
+        raw = resampling.ingest_telemetry(staging, SAURASHTRA, freq='h', validator=validator)
+        # Engineered columns come from the shared feature store, cached per raw-data version
+        df = water_data.engineer_features(raw, data_version=data_fingerprint(raw))
+        # The telemetry is filed under the version the dataset is published as
+        path = telemetry_path(data_fingerprint(df))
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+    # Keep the previous version's store for processes that have not re-attached yet
+    prefix = f'{SHARED_DATA_NAME}_telemetry-'
+    stores = sorted((os.path.join(TELEMETRY_DIR, f) for f in os.listdir(TELEMETRY_DIR)
+                     if f.startswith(prefix) and f.endswith('.parquet')), key=os.path.getmtime)
+    for old in [p for p in stores if p != path][:-1]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+    return df, {'quality': validator.totals}
+
+
+def is_complete(data_version):
+    """A publication is usable once its telemetry store and quality report are both there."""
+    return (os.path.exists(telemetry_path(data_version)) and os.path.exists(os.path.join(
+        shared_data.base_dir_or_default(), SHARED_DATA_NAME, data_version, 'quality.parquet')))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_shared_dataset(data_version):
+    """The dataset of one version, mapped from the host-wide shared copy."""
+    found = shared_data.attach(name=SHARED_DATA_NAME, version=data_version)
+    if found is None:
+        # Replaced since the version was read: map whatever is current
+        found = publish_dataset()
+    return found[0]
+
+
+def publish_dataset():
+    """(dataset, version) of the current shared copy, building and publishing it first if needed."""
+    return shared_data.load_or_publish(build_dataset, name=SHARED_DATA_NAME, max_age=SHARED_DATA_MAX_AGE,
+                                       accept=is_complete)
 
-    # fillna
-    df.fillna(method='bfill', inplace=True)
-    df.fillna(0, inplace=True)
-    
-    return df
+
+def get_data_version():
+    """
+    Version of the current dataset, read from the shared pointer on every call, so a
+    republish by any process (or a rebuild once SHARED_DATA_MAX_AGE has passed) is
+    picked up on the next rerun.
+    """
+    version = shared_data.current_version(name=SHARED_DATA_NAME, max_age=SHARED_DATA_MAX_AGE)
+    if version is None or not is_complete(version):
+        version = publish_dataset()[1]
+    return version
+
+
+@st.cache_data(show_spinner=False, max_entries=2)
+def get_quality_report(data_version):
+    """Per-district ingest quality totals of the ingest that produced this data version."""
+    report = shared_data.read_extra(data_version, 'quality', name=SHARED_DATA_NAME)
+    return report if report is not None else shared_data.read_extra(publish_dataset()[1], 'quality',
+                                                                     name=SHARED_DATA_NAME)
+
+
+def generate_synthetic_data(data_version=None):
+    """The enriched dataset: one read-only frame per process over the shared pages - no per-call copy."""
+    return get_shared_dataset(data_version or get_data_version())
 
 # -----------------------------------------------------------------------------
 # 3. AI MODELS
 # -----------------------------------------------------------------------------
 def train_models(df):
     """Trains Drought Classification and Water Gap Regression models."""
-    
-    # Features for Risk Classification
-    feature_cols = ['Rainfall_mm', 'Temperature_C', 'Groundwater_Level_mbgl', 'Reservoir_Level_pct', 'Month', 'Rain_30d_Avg']
-    target_risk = 'Risk_Label'
-    
-    # Features for Gap Forecasting (Lag based)
-    forecast_cols = ['Rainfall_mm', 'Temperature_C', 'Rain_Lag1', 'Rain_Lag7', 'Month']
-    target_gap = 'Water_Gap_MLD'
-    
-    # Split
-    X = df[feature_cols]
-    y_risk = df[target_risk]
-    y_gap = df[target_gap]
-    
-    # train/test
-    X_train, X_test, y_train_risk, y_test_risk, y_train_gap, y_test_gap = train_test_split(
-        X, y_risk, y_gap, test_size=0.2, random_state=42
-    )
-    
-    # Model 1: Drought Risk Classifier (Random Forest)
-    clf = RandomForestClassifier(n_estimators=100, random_state=42)
-    clf.fit(X_train, y_train_risk)
-    
-    # Model 2: Supply/Gap Regressor (Random Forest)
-    # Using 'X_train' but ideally we would shift for future forecasting. 
-    # For this demo, we predict 'current' gap based on 'current' conditions to identify anomalies.
-    reg = RandomForestRegressor(n_estimators=100, random_state=42)
-    reg.fit(X_train, y_train_gap)
-    
-    # Evaluation
-    acc = accuracy_score(y_test_risk, clf.predict(X_test))
-    mae = mean_absolute_error(y_test_gap, reg.predict(X_test))
-    
+    # Model inputs and targets are declared with the features (water_data);
+    # the fit itself is shared with the incremental refresh (model_refresh)
+    feature_cols = list(water_data.MODEL_FEATURES)
+    clf, reg, acc, mae = model_refresh.train_full(df, feature_cols)
     return clf, reg, acc, mae, feature_cols
 
+
+def schedule_snapshot(clf, reg, feature_cols, data_version, model_version):
+    """Queues the batch job that precomputes every district's risk and forecast for these models."""
+    latest_all = get_latest_all(data_version)
+    get_snapshot_store().refresh(data_version, model_version, lambda: build_snapshot(
+        clf, reg, latest_all, feature_cols, data_version, model_version))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_trained_models(data_version):
+    """
+    Models fitted on one data version, trained once per process and shared by the
+    sessions that start on it (refreshes build new objects, so sharing is safe).
+    Returns train_models' tuple plus the model version.
+    """
+    clf, reg, acc, mae, feature_cols = train_models(generate_synthetic_data(data_version))
+    model_version = model_fingerprint(clf, reg)
+    schedule_snapshot(clf, reg, feature_cols, data_version, model_version)
+    return clf, reg, acc, mae, feature_cols, model_version
+
+
+def refresh_models(df, data_version):
+    """
+    Brings the session's models up to date after the data changed: a few new trees
+    on the recent window (oldest retired), or a full retrain if accuracy on the new
+    rows drifted. Shows a toast either way and queues the snapshot job.
+    """
+    clf, reg, mode, _, reference, metrics = model_refresh.refresh_models(
+        st.session_state['clf'], st.session_state['reg'], df, st.session_state['trained_until'],
+        st.session_state.get('drift_reference'), st.session_state['feat_cols'])
+    if metrics is not None:
+        st.session_state['metrics'] = metrics
+    st.session_state['clf'] = clf
+    st.session_state['reg'] = reg
+    st.session_state['drift_reference'] = reference
+    st.session_state['model_version'] = model_fingerprint(clf, reg)
+    st.session_state['model_data_version'] = data_version
+    st.session_state['trained_until'] = df['Date'].max()
+    schedule_snapshot(clf, reg, st.session_state['feat_cols'], data_version, st.session_state['model_version'])
+    st.toast(t('models_refreshed' if mode == 'refresh' else 'models_retrained'))
+
+
+@st.cache_data(show_spinner=False)
+def get_latest_all(data_version):
+    """Latest row for every district (shared by the explainer and the risk map)."""
+    return generate_synthetic_data(data_version).groupby('District').last().reset_index()
+
+
+@st.cache_data(show_spinner=False)
+def get_alerts(data_version):
+    """Alerts over the loaded history (one incremental pass), newest first."""
+    alerts = AlertEngine().process(generate_synthetic_data(data_version))
+    return sorted(alerts, key=lambda a: a['date'], reverse=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def get_forecast_alerts(data_version, model_version):
+    """Forecast-rule alerts on the precomputed snapshot (call only once it is fresh)."""
+    projection = get_snapshot_store().gap_projection(data_version, model_version)
+    if projection is None:
+        return []
+    return AlertEngine(FORECAST_RULES).process(forecast_rows(*projection))
+
+
+@st.cache_data(show_spinner=False)
+def get_anomalies(data_version):
+    """Robust / seasonal anomaly scores for every district and day (one vectorised pass)."""
+    return AnomalyDetector().process(generate_synthetic_data(data_version))
+
+
+@st.cache_data(show_spinner=False)
+def get_unit_risk(_clf, feature_cols, level, data_version, model_version):
+    """
+    Conditions and predicted risk for every unit at a hierarchy level, scored in one
+    batched predict call. Also carries the population share of villages predicted
+    Critical under each unit, rolled up from village level.
+    """
+    latest_all = get_latest_all(data_version)
+    villages = water_data.unit_conditions(latest_all, 'village', SAURASHTRA)
+    village_proba = _clf.predict_proba(villages[feature_cols])
+    village_pred = _clf.classes_[village_proba.argmax(axis=1)]
+
+    units = villages if level == 'village' else water_data.unit_conditions(latest_all, level, SAURASHTRA)
+    proba = village_proba if level == 'village' else _clf.predict_proba(units[feature_cols])
+    units['Predicted_Risk'] = _clf.classes_[proba.argmax(axis=1)]
+    units['Predicted_Category'] = units['Predicted_Risk'].map({0: 'Safe', 1: 'Warning', 2: 'Critical'})
+    # Expected risk class (0 = Safe .. 2 = Critical) - a continuous score for heatmaps
+    units['Risk_Score'] = proba @ _clf.classes_
+    units['Critical_Village_Share'] = SAURASHTRA.rollup(
+        (village_pred == 2).astype(float), 'village', level, 'mean',
+        weights=villages['population_share'].to_numpy()
+    )
+    return units
+
+
+# layer -> (matplotlib / plotly colorscale, reversed, fixed range)
+HEATMAP_LAYERS = {
+    'Risk_Score': ('RdYlGn', True, (0, 2)),
+    'Gap_Intensity_MLD': ('RdYlGn', False, None),
+    'Groundwater_Level_mbgl': ('YlOrBr', False, None),
+}
+
+
+@st.cache_data(show_spinner=False)
+def get_risk_surfaces(_clf, feature_cols, data_version, model_version):
+    """IDW surfaces of every heatmap layer from village points, cached per data/model version."""
+    villages = get_unit_risk(_clf, feature_cols, 'village', data_version, model_version)
+    # Village gaps are population-share slices; scale back up so neighbours are comparable
+    villages['Gap_Intensity_MLD'] = villages['Water_Gap_MLD'] / villages['population_share']
+
+    layers = list(HEATMAP_LAYERS)
+    grid_lat, grid_lon = regional_grid(villages['lat'], villages['lon'])
+    stacked = idw_interpolate(villages['lat'], villages['lon'], villages[layers].to_numpy(), grid_lat, grid_lon)
+    return grid_lat, grid_lon, {layer: stacked[..., i] for i, layer in enumerate(layers)}
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def get_hourly_window(district, start, end, data_version):
+    """One district's hourly telemetry for [start, end), read from the store by row-group filters."""
+    return resampling.read_window(telemetry_path(data_version), district, start, end)
+
+
+@st.cache_data(show_spinner=False)
+def get_csv_bytes(data_version):
+    """UTF-8 CSV export of the dataset, encoded once per data version."""
+    return generate_synthetic_data(data_version).to_csv(index=False).encode('utf-8')
+
+
+@st.cache_data(show_spinner=False)
+def get_gap_forecast(_reg, _latest_data, feature_cols, district, data_version, model_version, future_days=30):
+    """30-day gap projection from the last known conditions (live fallback when the snapshot is stale)."""
+    # Simple forecasting visualization (persistence of last known features)
+    # In a real app, this would use the Regressor recursively
+    last_date = _latest_data['Date']
+    future_dates = [last_date + timedelta(days=x) for x in range(1, future_days+1)]
+
+    # Same seeded projection as the snapshot job, for a single district
+    latest = _latest_data.to_frame().T.assign(District=district)
+    latest = latest.astype(get_latest_all(data_version).dtypes[latest.columns].to_dict())
+    future_pred_gap = forecast_gaps(_reg, latest, feature_cols, data_version, future_days)[0]
+
+    return pd.DataFrame({'Date': future_dates, 'Predicted_Gap_MLD': future_pred_gap})
+
+
+@st.cache_data(show_spinner=False)
+def get_latest_attributions(_clf, _reg, _latest_all, feature_cols, model_version, data_date):
+    """Per-district risk and gap attributions, cached per model version and data date."""
+    return explain_latest(_clf, _reg, _latest_all, feature_cols)
+
+@st.cache_resource
+def get_diagnostics_runner():
+    """Process-wide background runner for permutation importance / partial dependence."""
+    return DiagnosticsRunner(max_workers=2)
+
+
+@st.cache_resource
+def get_snapshot_store():
+    """Process-wide reader / background refresher of the precomputed snapshot file."""
+    return SnapshotStore(SNAPSHOT_PATH)
+
+
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide LRU of serialized figures keyed by (figure, district, language, data, model)."""
+    return FigureCache(max_entries=512)
+
 # -----------------------------------------------------------------------------
 # 4. DASHBOARD UI
 # -----------------------------------------------------------------------------
+@st.fragment(run_every=2)
+def diagnostics_progress(job):
+    """Polls a running diagnostics job; triggers a full rerun once results are ready."""
+    if job.done:
+        st.rerun()
+    st.progress(job.progress, text=t('diag_running').format(pct=int(job.progress * 100)))
 
-def main():
-    # Authentication Check
-    if 'logged_in' not in st.session_state:
-        st.session_state['logged_in'] = False
-        
-    if not st.session_state['logged_in']:
-        login_page()
-        return
 
-    # Language Selection
-    if 'language' not in st.session_state:
-        st.session_state['language'] = 'English'
+def render_diagnostics(result, feat_cols, risk_map, fig_key):
+    """Permutation importance and partial dependence plots from a finished job."""
+    fig_cache = get_figure_cache()
+    fig_perm = fig_cache.get_or_build(
+        ('perm',) + fig_key,
+        lambda: px.bar(result['risk_importance'], x='Importance', y='Feature', error_x='Std',
+                       orientation='h', title=t('perm_importance'))
+    )
+    st.plotly_chart(fig_perm, width="stretch")
 
-    # Move language selector to top of sidebar
-    st.sidebar.markdown("### 🌐 Language")
-    st.session_state['language'] = st.sidebar.radio(
-        t('lang_label'),
-        options=['English', 'Gujarati'],
-        index=0 if st.session_state['language'] == 'English' else 1,
-        label_visibility="collapsed"
+    pdp_feature = st.selectbox(t('pdp_feature'), feat_cols, key='pdp_feature')
+    fig_pdp = fig_cache.get_or_build(
+        ('pdp', pdp_feature) + fig_key,
+        lambda: build_pdp_figure(result, pdp_feature, risk_map)
     )
-    
-    # Load Data
-    with st.spinner(t('loading_data')):
-        df = generate_synthetic_data()
-        
-    # Sidebar
-    st.sidebar.header(t('region_control'))
-    
-    # Download Button
-    csv = df.to_csv(index=False).encode('utf-8')
-    st.sidebar.download_button(
-        label="📥 Download Data (CSV)",
-        data=csv,
-        file_name='saurashtra_data.csv',
-        mime='text/csv',
+    st.plotly_chart(fig_pdp, width="stretch")
+
+
+def build_pdp_figure(result, pdp_feature, risk_map):
+    """Partial dependence of class probabilities (left axis) and water gap (right axis)."""
+    curve = result['pdp'][pdp_feature]
+    fig_pdp = go.Figure()
+    for k, cls in enumerate(result['classes']):
+        fig_pdp.add_trace(go.Scatter(x=curve['grid'], y=curve['risk'][k], name=risk_map[cls]))
+    fig_pdp.add_trace(go.Scatter(x=curve['gap_grid'], y=curve['gap'], name=t('water_gap'),
+                                 yaxis='y2', line=dict(dash='dot', color='#1E3A8A')))
+    fig_pdp.update_layout(
+        title=t('pdp_title').format(feature=pdp_feature),
+        xaxis=dict(title=pdp_feature),
+        yaxis=dict(title='P(class)', range=[0, 1], gridcolor='#e2e8f0'),
+        yaxis2=dict(title='MLD', overlaying='y', side='right'),
+        legend=dict(x=0, y=1.1, orientation='h'),
+        plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)'
     )
-    
-    selected_district = st.sidebar.selectbox(t('select_district'), df['District'].unique())
-    
-    st.sidebar.markdown("---")
-    if st.sidebar.button("🔓 Sign Out", key="logout_btn", use_container_width=True):
-        st.session_state['logged_in'] = False
-        st.rerun()
+    return fig_pdp
+
+def add_anomaly_markers(fig, frame, flags, column, yaxis='y'):
+    """Red crosses on the days where `column` was flagged (flags aligned with frame by Date)."""
+    hits = frame[frame['Date'].isin(flags.loc[flags[f'{column}_anomaly'], 'Date'])]
+    if len(hits):
+        fig.add_trace(go.Scatter(x=hits['Date'], y=hits[column], mode='markers', yaxis=yaxis,
+                                 name=f"{t('anomaly_marker')}: {column}",
+                                 marker=dict(color='red', symbol='x', size=11, line=dict(width=2))))
+
+
+def build_rain_gw_figure(district_df, flags=None):
+    """Dual axis plot: rainfall bars vs groundwater depth over the last 90 days, anomalies marked."""
+    recent = district_df.tail(90)
+    fig_dual = go.Figure()
+    fig_dual.add_trace(go.Bar(x=recent['Date'], y=recent['Rainfall_mm'], name='Rainfall (mm)', marker_color='blue', opacity=0.6))
+    fig_dual.add_trace(go.Scatter(x=recent['Date'], y=recent['Groundwater_Level_mbgl'], name='Groundwater (mbgl)', yaxis='y2', line=dict(color='brown', width=3)))
+    if flags is not None:
+        add_anomaly_markers(fig_dual, recent, flags, 'Rainfall_mm')
+        add_anomaly_markers(fig_dual, recent, flags, 'Groundwater_Level_mbgl', yaxis='y2')
+
+    fig_dual.update_layout(
+        title=t('rain_vs_gw'),
+        yaxis=dict(title='Rainfall (mm)', gridcolor='#e2e8f0'),
+        yaxis2=dict(title='Groundwater (mbgl)', overlaying='y', side='right', autorange="reversed", gridcolor='#f1f5f9'),
+        legend=dict(x=0, y=1.1, orientation='h'),
+        margin=dict(l=0, r=0, t=80, b=0),
+        plot_bgcolor='white',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig_dual
+
+
+def build_hourly_figure(window):
+    """Hourly rainfall bars with reservoir and groundwater gauge lines."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=window['Date'], y=window['Rainfall_mm'], name='Rainfall (mm/h)', marker_color='blue', opacity=0.6))
+    fig.add_trace(go.Scatter(x=window['Date'], y=window['Reservoir_Level_pct'], name='Reservoir (%)', yaxis='y2', line=dict(color='teal')))
+    fig.add_trace(go.Scatter(x=window['Date'], y=window['Groundwater_Level_mbgl'], name='Groundwater (mbgl)', yaxis='y3', line=dict(color='brown')))
+    fig.update_layout(
+        title=t('hourly_title'),
+        xaxis=dict(domain=[0, 0.9]),
+        yaxis=dict(title='Rainfall (mm/h)', gridcolor='#e2e8f0'),
+        yaxis2=dict(title='Reservoir (%)', overlaying='y', side='right'),
+        yaxis3=dict(title='Groundwater (mbgl)', overlaying='y', side='right', position=1.0, anchor='free', autorange="reversed"),
+        legend=dict(x=0, y=1.1, orientation='h'),
+        margin=dict(l=0, r=0, t=80, b=0),
+        plot_bgcolor='white',
+        paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig
+
+
+def build_supply_demand_figure(district_df, flags=None):
+    """Supply vs demand lines over the last 180 days with the deficit zone shaded and demand anomalies marked."""
+    recent = district_df.tail(180)
+    fig_gap = px.line(recent, x='Date', y=['Estimated_Supply_MLD', 'Water_Demand_MLD'],
+                      color_discrete_map={'Estimated_Supply_MLD': 'green', 'Water_Demand_MLD': 'red'},
+                      title=t('supply_vs_demand'))
+    fig_gap.add_hrect(y0=-50, y1=0, line_width=0, fillcolor="red", opacity=0.1, annotation_text=t('deficit_zone'))
+    if flags is not None:
+        add_anomaly_markers(fig_gap, recent, flags, 'Water_Demand_MLD')
+    return fig_gap
+
+
+def build_forecast_figure(forecast_df):
+    """Bar chart of the projected daily water gap."""
+    return px.bar(forecast_df, x='Date', y='Predicted_Gap_MLD',
+                  color='Predicted_Gap_MLD',
+                  color_continuous_scale='RdYlGn',
+                  title=t('forecast_title').format(days=len(forecast_df)))
+
+
+def build_importance_figure(clf, feat_cols):
+    """Global (impurity) feature importances of the risk classifier."""
+    importances = clf.feature_importances_
+    indices = np.argsort(importances)
+
+    feat_df = pd.DataFrame({
+        'Feature': [feat_cols[i] for i in indices],
+        'Importance': importances[indices]
+    })
+    return px.bar(feat_df, x='Importance', y='Feature', orientation='h', title=t('risk_factors'))
+
+
+def build_risk_map_figure(units, level):
+    """Predicted risk per spatial unit on an OpenStreetMap base layer."""
+    # District points are sized by demand; sub-district units are too many to size meaningfully
+    fig_map = px.scatter_mapbox(units, lat="lat", lon="lon", color="Predicted_Category",
+                                size="Water_Demand_MLD" if level == 'district' else None,
+                                color_discrete_map={'Safe': 'green', 'Warning': 'orange', 'Critical': 'red'},
+                                hover_name="name",
+                                hover_data={'District': True, 'Groundwater_Level_mbgl': ':.1f',
+                                            'Water_Gap_MLD': ':.1f', 'Critical_Village_Share': ':.0%',
+                                            **({'District_Forecast_Gap_MLD': ':.1f'}
+                                               if 'District_Forecast_Gap_MLD' in units else {}),
+                                            'lat': False, 'lon': False},
+                                zoom=6, height=500,
+                                title=t('regional_risk_map'))
+
+    fig_map.update_layout(mapbox_style="open-street-map")
+    fig_map.update_layout(margin={"r":0,"t":0,"l":0,"b":0}) # Full width
+    return fig_map
+
+
+def build_heatmap_figure(grid_lat, grid_lon, surface, layer):
+    """Interpolated surface as a raster image layer, with district labels and a colour bar."""
+    colorscale, reverse, value_range = HEATMAP_LAYERS[layer]
+    vmin, vmax = value_range if value_range else (np.nanmin(surface), np.nanmax(surface))
+    image = surface_to_png(surface, cmap=colorscale + ('_r' if reverse else ''), vmin=vmin, vmax=vmax)
+
+    half = (grid_lat[1] - grid_lat[0]) / 2
+    lat0, lat1 = grid_lat[0] - half, grid_lat[-1] + half
+    lon0, lon1 = grid_lon[0] - half, grid_lon[-1] + half
+
+    districts = SAURASHTRA.table('district')
+    fig = go.Figure(go.Scattermapbox(
+        lat=districts['lat'], lon=districts['lon'], text=districts['name'],
+        mode='markers+text', textposition='top center',
+        marker=dict(size=6, color=[vmin] * len(districts), cmin=vmin, cmax=vmax,
+                    colorscale=colorscale, reversescale=reverse, showscale=True,
+                    colorbar=dict(title=layer)),
+        hoverinfo='text',
+    ))
+    fig.update_layout(
+        mapbox=dict(
+            style='open-street-map', zoom=6,
+            center=dict(lat=float(districts['lat'].mean()), lon=float(districts['lon'].mean())),
+            layers=[dict(sourcetype='image', source=image, opacity=0.65, below='traces',
+                         coordinates=[[lon0, lat1], [lon1, lat1], [lon1, lat0], [lon0, lat0]])],
+        ),
+        title=t(f'layer_{layer}'), height=500,
+        margin={"r":0,"t":30,"l":0,"b":0},
+    )
+    return fig
+
+
+def build_gw_balance_figure(latest_data):
+    """Natural/artificial recharge vs extraction for the latest day."""
+    gw_viz_df = pd.DataFrame({
+        'Component': ['Natural Recharge', 'Artificial Recharge', 'Extraction'],
+        'MLD': [latest_data['Natural_Recharge_MLD'], latest_data['Artificial_Recharge_MLD'], -latest_data['Extraction_MLD']]
+    })
+    return px.bar(gw_viz_df, x='Component', y='MLD', color='Component',
+                  color_discrete_map={'Natural Recharge': '#3b82f6', 'Artificial Recharge': '#10b981', 'Extraction': '#ef4444'},
+                  title="Net Groundwater Balance Components")
+
+
+def contribution_waterfall(base, contributions, features, title, fmt):
+    """Waterfall from the model baseline, through each feature's push, to the final prediction."""
+    order = np.argsort(-np.abs(contributions))
+    fig = go.Figure(go.Waterfall(
+        orientation='h',
+        measure=['absolute'] + ['relative'] * len(order) + ['total'],
+        y=[t('baseline')] + [features[i] for i in order] + [t('prediction')],
+        x=[base] + [contributions[i] for i in order] + [0],
+        text=[fmt.format(base)] + [fmt.format(contributions[i]) for i in order] + [fmt.format(base + contributions.sum())],
+        increasing=dict(marker=dict(color='#DC2626')),
+        decreasing=dict(marker=dict(color='#059669')),
+        totals=dict(marker=dict(color='#1E3A8A')),
+    ))
+    fig.update_layout(title=title, yaxis=dict(autorange='reversed'), showlegend=False,
+                      plot_bgcolor='white', paper_bgcolor='rgba(0,0,0,0)')
+    return fig
+
+
+RISK_COLORS = {0: '#059669', 1: '#D97706', 2: '#DC2626'}
+
+# Lazy tab rendering: only the open tab's body executes on a rerun, so first-load
+# cost scales with what the user views. Set to False to render all tabs eagerly.
+LAZY_TABS = True
+# Figure-cache hit/miss counts in the sidebar: a tuning aid, off unless SAURASHTRA_DEBUG=1
+SHOW_CACHE_STATS = os.environ.get('SAURASHTRA_DEBUG') == '1'
+
+
+def tab_is_open(tab):
+    """True for the active tab (lazy mode) or for every tab when tabs don't track state."""
+    return tab.open is not False
+
+
+def risk_labels():
+    """Localized, emoji-prefixed label per risk class."""
+    return {0: '✅ '+t('risk_safe'), 1: '⚠️ '+t('risk_warning'), 2: '🚨 '+t('risk_critical')}
+
+# -----------------------------------------------------------------------------
+# DASHBOARD FRAGMENTS
+# -----------------------------------------------------------------------------
+# Each section is an st.fragment, so a widget interaction inside it (chat message,
+# PDP feature picker, diagnostics polling) reruns only that section instead of
+# re-executing main(). Sidebar controls (language, district) still trigger a full
+# rerun because every section depends on them. `ctx` carries the per-run state.
+
+@st.fragment
+def render_header_metrics(ctx):
+    selected_district = ctx['district']
+    latest_data = ctx['latest_data']
+    feat_cols = ctx['feat_cols']
+    acc, _ = ctx['metrics']
 
     # --- CUSTOM HEADER ---
-    # Moved here so selected_district is available
     st.markdown(f"""
     <div class="header-container">
         <div>
@@ -712,34 +1129,19 @@ def main():
         </div>
     </div>
     """, unsafe_allow_html=True)
-    
-    # Filter Data
-    district_df = df[df['District'] == selected_district].sort_values(by='Date')
-    latest_data = district_df.iloc[-1]
-    
-    # Train Models (On the fly for demo purposes, usually pre-trained)
-    if 'model_trained' not in st.session_state:
-        with st.spinner(t('training_models')):
-            clf, reg, acc, mae, feat_cols = train_models(df)
-            st.session_state['clf'] = clf
-            st.session_state['reg'] = reg
-            st.session_state['metrics'] = (acc, mae)
-            st.session_state['feat_cols'] = feat_cols
-            st.session_state['model_trained'] = True
-    
-    clf = st.session_state['clf']
-    reg = st.session_state['reg']
-    acc, mae = st.session_state['metrics']
-    feat_cols = st.session_state['feat_cols']
 
     # ------------------
     # TOP METRICS (Custom Card Designs)
     # ------------------
-    X_input = pd.DataFrame([latest_data[feat_cols]], columns=feat_cols)
-    pred_risk = clf.predict(X_input)[0]
-    
-    risk_map = {0: '✅ '+t('risk_safe'), 1: '⚠️ '+t('risk_warning'), 2: '🚨 '+t('risk_critical')}
-    risk_color = {0: '#059669', 1: '#D97706', 2: '#DC2626'}
+    snapshot = ctx['snapshot']
+    if snapshot is not None:
+        pred_risk = snapshot['risk']
+    else:
+        X_input = pd.DataFrame([latest_data[feat_cols]], columns=feat_cols)
+        pred_risk = ctx['clf'].predict(X_input)[0]
+
+    risk_map = risk_labels()
+    risk_color = RISK_COLORS
 
     st.markdown(f"""
     <div class="metric-container">
@@ -771,163 +1173,228 @@ def main():
         </div>
     </div>
     """, unsafe_allow_html=True)
-    # ------------------
-    # TABS (5 TABS)
-    # ------------------
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
-        t('tab_overview'), t('tab_forecast'), t('tab_explain'), t('tab_map'), "🏗️ Groundwater Analysis"
-    ])
+
+
+@st.fragment
+def render_overview_tab(ctx):
+    selected_district = ctx['district']
+    district_df = ctx['district_df']
+    district_key = ctx['district_key']
+    fig_cache = get_figure_cache()
+    anomalies = get_anomalies(ctx['data_version'])
+    flags = anomalies[anomalies['District'] == selected_district]
+
+    st.subheader(f"{t('water_dynamics')}: {selected_district}")
     
-    # TAB 1: OVERVIEW
-    with tab1:
-        st.subheader(f"{t('water_dynamics')}: {selected_district}")
-        
-        # Dual Axis Plot: Rainfall vs Groundwater
-        fig_dual = go.Figure()
-        fig_dual.add_trace(go.Bar(x=district_df['Date'].tail(90), y=district_df['Rainfall_mm'].tail(90), name='Rainfall (mm)', marker_color='blue', opacity=0.6))
-        fig_dual.add_trace(go.Scatter(x=district_df['Date'].tail(90), y=district_df['Groundwater_Level_mbgl'].tail(90), name='Groundwater (mbgl)', yaxis='y2', line=dict(color='brown', width=3)))
-        
-        fig_dual.update_layout(
-            title=t('rain_vs_gw'),
-            yaxis=dict(title='Rainfall (mm)', gridcolor='#e2e8f0'),
-            yaxis2=dict(title='Groundwater (mbgl)', overlaying='y', side='right', autorange="reversed", gridcolor='#f1f5f9'),
-            legend=dict(x=0, y=1.1, orientation='h'),
-            margin=dict(l=0, r=0, t=80, b=0),
-            plot_bgcolor='white',
-            paper_bgcolor='rgba(0,0,0,0)'
+    # Dual Axis Plot: Rainfall vs Groundwater
+    fig_dual = fig_cache.get_or_build(('dual',) + district_key, lambda: build_rain_gw_figure(district_df, flags))
+    st.plotly_chart(fig_dual, width="stretch")
+
+    # Every stream (reservoir included) flagged in the charted window
+    recent = flags[flags['Anomaly'] & (flags['Date'] > district_df['Date'].max() - timedelta(days=90))]
+    if len(recent):
+        streams = [c for c in anomalies.columns if c.endswith('_anomaly')]
+        items = '; '.join(f"{row.Date:%d %b} ({', '.join(c[:-len('_anomaly')] for c in streams if getattr(row, c))})"
+                          for row in recent.itertuples())
+        st.caption(t('anomalies_caption').format(items=items))
+
+    # Zoom: only the requested slice of the hourly store is read
+    with st.expander(t('hourly_zoom')):
+        last_day = district_df['Date'].max().date()
+        window = st.date_input(t('zoom_window'), value=(last_day - timedelta(days=6), last_day),
+                               min_value=district_df['Date'].min().date(), max_value=last_day,
+                               key='zoom_window')
+        if len(window) == 2:
+            start = window[0]
+            end = min(window[1], start + timedelta(days=MAX_ZOOM_DAYS - 1)) + timedelta(days=1)
+            hourly = get_hourly_window(selected_district, start, end, ctx['data_version'])
+            fig_hourly = fig_cache.get_or_build(('hourly', start, end) + district_key,
+                                                lambda: build_hourly_figure(hourly))
+            st.plotly_chart(fig_hourly, width="stretch")
+    
+    # Supply vs Demand Gap
+    st.subheader(t('demand_supply_gap'))
+    fig_gap = fig_cache.get_or_build(('gap',) + district_key, lambda: build_supply_demand_figure(district_df, flags))
+    st.plotly_chart(fig_gap, width="stretch")
+
+
+@st.fragment
+def render_forecast_tab(ctx):
+    selected_district = ctx['district']
+    latest_data = ctx['latest_data']
+    reg = ctx['reg']
+    feat_cols = ctx['feat_cols']
+    data_version = ctx['data_version']
+    model_version = ctx['model_version']
+    district_key = ctx['district_key']
+    fig_cache = get_figure_cache()
+
+    st.subheader(t('short_term_forecast'))
+    
+    snapshot = ctx['snapshot']
+    if snapshot is not None:
+        forecast_df = snapshot['forecast']
+    else:
+        forecast_df = get_gap_forecast(reg, latest_data, feat_cols, selected_district, data_version, model_version)
+    fig_cast = fig_cache.get_or_build(('cast',) + district_key, lambda: build_forecast_figure(forecast_df))
+    st.plotly_chart(fig_cast, width="stretch")
+    
+    st.info(t('recommendation') + (t('rec_conserve') if forecast_df['Predicted_Gap_MLD'].mean() < 0 else t('rec_stable')))
+
+
+@st.fragment
+def render_explain_tab(ctx):
+    df = ctx['df']
+    selected_district = ctx['district']
+    clf, reg = ctx['clf'], ctx['reg']
+    feat_cols = ctx['feat_cols']
+    latest_all = get_latest_all(ctx['data_version'])
+    model_version = ctx['model_version']
+    data_date = ctx['data_date']
+    district_key, region_key = ctx['district_key'], ctx['region_key']
+    risk_map = risk_labels()
+    fig_cache = get_figure_cache()
+
+    st.markdown(t('why_ai'))
+    
+    # Feature Importance
+    fig_feat = fig_cache.get_or_build(('feat',) + region_key, lambda: build_importance_figure(clf, feat_cols))
+    st.plotly_chart(fig_feat, width="stretch")
+
+    # Local explanation: tree-path contributions for the selected district
+    attr = get_latest_attributions(clf, reg, latest_all, feat_cols, model_version, data_date)
+    row = attr['districts'].index(selected_district)
+    k = int(np.argmax(attr['risk_proba'][row]))
+    risk_label = risk_map[attr['classes'][k]]
+
+    st.markdown(t('why_district').format(district=selected_district))
+    c1, c2 = st.columns(2)
+    with c1:
+        fig_why_risk = fig_cache.get_or_build(('why_risk',) + district_key, lambda: contribution_waterfall(
+            attr['risk_bias'][k], attr['risk_contrib'][row, :, k], attr['features'],
+            t('risk_waterfall').format(label=risk_label), '{:+.2f}'
+        ))
+        st.plotly_chart(fig_why_risk, width="stretch")
+    with c2:
+        fig_why_gap = fig_cache.get_or_build(('why_gap',) + district_key, lambda: contribution_waterfall(
+            attr['gap_bias'], attr['gap_contrib'][row], attr['features'],
+            t('gap_waterfall'), '{:+.1f}'
+        ))
+        st.plotly_chart(fig_why_gap, width="stretch")
+
+    # Unbiased diagnostics, computed in the background per model version
+    runner = get_diagnostics_runner()
+    job = runner.get(model_version)
+    if job is None:
+        diag_df = df.sample(n=min(3000, len(df)), random_state=42)
+        job = runner.submit(model_version, clf, reg, diag_df[feat_cols],
+                            diag_df['Risk_Label'], diag_df['Water_Gap_MLD'])
+    if job.error is not None:
+        st.warning(t('diag_failed').format(error=job.error))
+    elif job.done:
+        render_diagnostics(job.result, feat_cols, risk_map, region_key)
+    else:
+        diagnostics_progress(job)
+    
+    st.markdown(f"""
+    {t('interpretation')}
+    {t('interp_res')}
+    {t('interp_gw')}
+    {t('interp_rain')}
+    """)
+
+
+@st.fragment
+def render_map_tab(ctx):
+    selected_district = ctx['district']
+    region_key = ctx['region_key']
+    fig_cache = get_figure_cache()
+
+    st.subheader(t('regional_risk_map'))
+
+    map_layer = st.selectbox(t('map_layer'), ['points'] + list(HEATMAP_LAYERS),
+                             format_func=lambda layer: t(f'layer_{layer}'), key='map_layer')
+    if map_layer != 'points':
+        # Heatmap: IDW surface over the whole region, interpolated from every village
+        grid_lat, grid_lon, surfaces = get_risk_surfaces(ctx['clf'], ctx['feat_cols'],
+                                                         ctx['data_version'], ctx['model_version'])
+        fig_heat = fig_cache.get_or_build(
+            ('heat', map_layer) + region_key,
+            lambda: build_heatmap_figure(grid_lat, grid_lon, surfaces[map_layer], map_layer)
         )
-        st.plotly_chart(fig_dual, width="stretch")
-        
-        # Supply vs Demand Gap
-        st.subheader(t('demand_supply_gap'))
-        fig_gap = px.line(district_df.tail(180), x='Date', y=['Estimated_Supply_MLD', 'Water_Demand_MLD'], 
-                          color_discrete_map={'Estimated_Supply_MLD': 'green', 'Water_Demand_MLD': 'red'},
-                          title=t('supply_vs_demand'))
-        fig_gap.add_hrect(y0=-50, y1=0, line_width=0, fillcolor="red", opacity=0.1, annotation_text=t('deficit_zone'))
-        st.plotly_chart(fig_gap, width="stretch")
+        st.plotly_chart(fig_heat, width="stretch")
+        return
 
-    # TAB 2: FORECAST
-    with tab2:
-        st.subheader(t('short_term_forecast'))
-        
-        # Simple forecasting visualization (using moving average projection for demo)
-        # In a real app, this would use the Regressor recursively
-        future_days = 30
-        last_date = district_df['Date'].max()
-        future_dates = [last_date + timedelta(days=x) for x in range(1, future_days+1)]
-        
-        # Create dummy future features based on last known values (simple persistence)
-        future_input = pd.DataFrame([latest_data[feat_cols]] * future_days)
-        # Jitter them slightly for realism
-        future_input['Rainfall_mm'] = np.random.gamma(1, 2, future_days) # Random rain
-        future_pred_gap = reg.predict(future_input)
-        
-        forecast_df = pd.DataFrame({'Date': future_dates, 'Predicted_Gap_MLD': future_pred_gap})
-        
-        fig_cast = px.bar(forecast_df, x='Date', y='Predicted_Gap_MLD', 
-                          color='Predicted_Gap_MLD', 
-                          color_continuous_scale='RdYlGn',
-                          title=t('forecast_title').format(days=future_days))
-        st.plotly_chart(fig_cast, width="stretch")
-        
-        st.info(t('recommendation') + (t('rec_conserve') if forecast_df['Predicted_Gap_MLD'].mean() < 0 else t('rec_stable')))
+    # Drill-down: district -> taluka -> village, optionally scoped to the selected district
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        level = st.radio(t('map_level'), LEVELS, format_func=lambda lvl: t(f'level_{lvl}'),
+                         horizontal=True, key='map_level')
+    with c2:
+        only_selected = st.checkbox(t('only_district').format(district=selected_district),
+                                    value=False, key='map_only_district')
 
-    # TAB 3: EXPLAINABLE AI
-    with tab3:
-        st.markdown(t('why_ai'))
-        
-        # Feature Importance
-        importances = clf.feature_importances_
-        indices = np.argsort(importances)
-        
-        feat_df = pd.DataFrame({
-            'Feature': [feat_cols[i] for i in indices],
-            'Importance': importances[indices]
-        })
-        
-        fig_feat = px.bar(feat_df, x='Importance', y='Feature', orientation='h', title=t('risk_factors'))
-        st.plotly_chart(fig_feat, width="stretch")
-        
-        st.markdown(f"""
-        {t('interpretation')}
-        {t('interp_res')}
-        {t('interp_gw')}
-        {t('interp_rain')}
-        """)
+    units = get_unit_risk(ctx['clf'], ctx['feat_cols'], level, ctx['data_version'], ctx['model_version'])
+    if only_selected:
+        units = units[units['District'] == selected_district]
+    scope = selected_district if only_selected else None
 
-    # TAB 4: RISK MAP
-    with tab4:
-        st.subheader(t('regional_risk_map'))
-        
-        # Aggregate latest risk for all districts
-        latest_all = df.groupby('District').last().reset_index()
-        
-        # Simulate Lat/Lon for Saurashtra Districts (Approximate)
-        coords = {
-            'Rajkot': [22.30, 70.80],
-            'Jamnagar': [22.47, 70.05],
-            'Junagadh': [21.52, 70.45],
-            'Amreli': [21.60, 71.22],
-            'Bhavnagar': [21.76, 72.15],
-            'Porbandar': [21.64, 69.62],
-            'Morbi': [22.81, 70.83],
-            'Dwarka': [22.24, 68.96]
-        }
-        
-        latest_all['lat'] = latest_all['District'].map(lambda x: coords[x][0])
-        latest_all['lon'] = latest_all['District'].map(lambda x: coords[x][1])
-        latest_all['Risk_Score'] = latest_all['Risk_Label'] # 0, 1, 2
-        
-        fig_map = px.scatter_mapbox(latest_all, lat="lat", lon="lon", color="Risk_Category", size="Water_Demand_MLD",
-                                    color_discrete_map={'Safe': 'green', 'Warning': 'orange', 'Critical': 'red'},
-                                    hover_name="District", zoom=6, height=500,
-                                    title=t('regional_risk_map'))
-        
-        fig_map.update_layout(mapbox_style="open-street-map")
-        fig_map.update_layout(margin={"r":0,"t":0,"l":0,"b":0}) # Full width
-        st.plotly_chart(fig_map, width="stretch")
+    # Region-wide forecast from the snapshot (shown once it is fresh)
+    forecast = get_snapshot_store().mean_forecast_gap(ctx['data_version'], ctx['model_version'])
+    if forecast is not None:
+        units = units.assign(District_Forecast_Gap_MLD=units['District'].map(forecast))
 
-    # TAB 5: GROUNDWATER ANALYSIS (NEW)
-    with tab5:
-        st.subheader("🏗️ Groundwater Stress & Dynamics")
-        
-        # Display Current Status
-        status = latest_data['groundwater_status']
-        status_colors = {"Safe": "green", "Warning": "orange", "Critical": "red"}
-        
-        st.markdown(f"""
-        <div style="padding: 1.5rem; border-radius: 12px; background: white; border-left: 8px solid {status_colors[status]}; box-shadow: 0 4px 6px rgba(0,0,0,0.05);">
-            <h3 style="margin-top:0; color: {status_colors[status]}">Status: {status}</h3>
-            <p style="font-size: 1.1rem; color: #475569;">{latest_data['groundwater_explanation']}</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        st.write("---")
+    st.caption(t('units_at_risk').format(critical=int((units['Predicted_Risk'] == 2).sum()), total=len(units)))
+    fig_map = fig_cache.get_or_build(('map', level, scope, forecast is not None) + region_key,
+                                     lambda: build_risk_map_figure(units, level))
+    st.plotly_chart(fig_map, width="stretch")
+
+
+@st.fragment
+def render_groundwater_tab(ctx):
+    latest_data = ctx['latest_data']
+    district_key = ctx['district_key']
+    fig_cache = get_figure_cache()
+
+    st.subheader("🏗️ Groundwater Stress & Dynamics")
+    
+    # Display Current Status
+    status = latest_data['groundwater_status']
+    status_colors = {"Safe": "green", "Warning": "orange", "Critical": "red"}
+    
+    st.markdown(f"""
+    <div style="padding: 1.5rem; border-radius: 12px; background: white; border-left: 8px solid {status_colors[status]}; box-shadow: 0 4px 6px rgba(0,0,0,0.05);">
+        <h3 style="margin-top:0; color: {status_colors[status]}">Status: {status}</h3>
+        <p style="font-size: 1.1rem; color: #475569;">{latest_data['groundwater_explanation']}</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.write("---")
+    
+    # Metrics Row
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        st.metric("Total Extraction Wells", int(latest_data['extraction_borewells']))
+    with c2:
+        st.metric("Total Recharge Wells", int(latest_data['recharge_borewells']))
+    with c3:
+        st.metric("Net GW Change (MLD)", f"{latest_data['Net_GW_Change_MLD']:.2f}", 
+                  delta=f"{latest_data['Net_GW_Change_MLD']:.2f}")
         
-        # Metrics Row
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            st.metric("Total Extraction Wells", int(latest_data['extraction_borewells']))
-        with c2:
-            st.metric("Total Recharge Wells", int(latest_data['recharge_borewells']))
-        with c3:
-            st.metric("Net GW Change (MLD)", f"{latest_data['Net_GW_Change_MLD']:.2f}", 
-                      delta=f"{latest_data['Net_GW_Change_MLD']:.2f}")
-            
-        # Visualization
-        st.subheader("Analysis Breakdown")
-        gw_viz_df = pd.DataFrame({
-            'Component': ['Natural Recharge', 'Artificial Recharge', 'Extraction'],
-            'MLD': [latest_data['Natural_Recharge_MLD'], latest_data['Artificial_Recharge_MLD'], -latest_data['Extraction_MLD']]
-        })
-        fig_gw = px.bar(gw_viz_df, x='Component', y='MLD', color='Component',
-                       color_discrete_map={'Natural Recharge': '#3b82f6', 'Artificial Recharge': '#10b981', 'Extraction': '#ef4444'},
-                       title="Net Groundwater Balance Components")
-        st.plotly_chart(fig_gw, width="stretch")
-
-    # -----------------------------------------------------------------------------
-    # FLOATING AI ASSISTANT (Bottom Right)
-    # -----------------------------------------------------------------------------
+    # Visualization
+    st.subheader("Analysis Breakdown")
+    fig_gw = fig_cache.get_or_build(('gw',) + district_key, lambda: build_gw_balance_figure(latest_data))
+    st.plotly_chart(fig_gw, width="stretch")
+
+
+# -----------------------------------------------------------------------------
+# FLOATING AI ASSISTANT (Bottom Right)
+# -----------------------------------------------------------------------------
+@st.fragment
+def render_assistant(ctx):
+    latest_data = ctx['latest_data']
+    selected_district = ctx['district']
+
     with st.container():
         with st.popover("🤖"):
             st.subheader(t('assistant_header'))
@@ -937,10 +1404,9 @@ def main():
             if "messages" not in st.session_state:
                 st.session_state.messages = []
 
-            # Display chat history
-            for message in st.session_state.messages:
-                with st.chat_message(message["role"]):
-                    st.markdown(message["content"])
+            # History is drawn into a placeholder after the input is handled, so a new
+            # message shows up in the same fragment run without a second rerun
+            history = st.container()
 
             # Chat input
             if prompt := st.chat_input("Ask about water security...", key="floating_chat"):
@@ -952,9 +1418,170 @@ def main():
                 
                 # Add assistant response
                 st.session_state.messages.append({"role": "assistant", "content": response})
-                
-                # Rerun to show new messages in popover
-                st.rerun()
+
+            # Display chat history
+            with history:
+                for message in st.session_state.messages:
+                    with st.chat_message(message["role"]):
+                        st.markdown(message["content"])
+
+
+def main():
+    # Authentication Check
+    if 'logged_in' not in st.session_state:
+        st.session_state['logged_in'] = False
+
+    if not st.session_state['logged_in']:
+        login_page()
+        return
+
+    # Language Selection
+    if 'language' not in st.session_state:
+        st.session_state['language'] = 'English'
+
+    # Move language selector to top of sidebar
+    st.sidebar.markdown("### 🌐 Language")
+    st.session_state['language'] = st.sidebar.radio(
+        t('lang_label'),
+        options=['English', 'Gujarati'],
+        index=0 if st.session_state['language'] == 'English' else 1,
+        label_visibility="collapsed"
+    )
+
+    # Load Data
+    with st.spinner(t('loading_data')):
+        data_version = get_data_version()
+        df = generate_synthetic_data(data_version)
+
+    # Sidebar
+    st.sidebar.header(t('region_control'))
+
+    # Download Button (CSV is encoded lazily, on click, and cached per data load)
+    st.sidebar.download_button(
+        label="📥 Download Data (CSV)",
+        data=lambda: get_csv_bytes(data_version),
+        file_name='saurashtra_data.csv',
+        mime='text/csv',
+        on_click='ignore',
+    )
+
+    selected_district = st.sidebar.selectbox(t('select_district'), df['District'].unique())
+
+    with st.sidebar.expander(t('alerts_title')):
+        district_alerts = get_alerts(data_version)
+        # Forecast alerts appear once a session has models and their snapshot is ready
+        model_version = st.session_state.get('model_version')
+        if model_version is not None and get_snapshot_store().is_fresh(data_version, model_version):
+            district_alerts = get_forecast_alerts(data_version, model_version) + district_alerts
+        district_alerts = [a for a in district_alerts if a['district'] == selected_district][:5]
+        for alert in district_alerts:
+            icon = '🔴' if alert['severity'] == 'critical' else '🟠'
+            st.caption(f"{icon} {alert['date']} - {alert['message']}")
+        if not district_alerts:
+            st.caption(t('no_alerts'))
+
+    quality = get_quality_report(data_version).set_index('District').loc[selected_district]
+    st.sidebar.caption(t('quality_caption').format(passed=quality['passed'], rows=quality['rows'],
+                                                   quarantined=quality['quarantined'], gaps=quality['missing_steps']))
+
+    st.sidebar.markdown("---")
+    if st.sidebar.button("🔓 Sign Out", key="logout_btn", use_container_width=True):
+        st.session_state['logged_in'] = False
+        st.rerun()
+
+    # Filter Data
+    district_df = df[df['District'] == selected_district].sort_values(by='Date')
+    latest_data = district_df.iloc[-1]
+
+    # Train Models (once per data version and process, shared by new sessions)
+    if 'model_trained' not in st.session_state:
+        with st.spinner(t('training_models')):
+            clf, reg, acc, mae, feat_cols, model_version = get_trained_models(data_version)
+            st.session_state['clf'] = clf
+            st.session_state['reg'] = reg
+            st.session_state['metrics'] = (acc, mae)
+            st.session_state['feat_cols'] = feat_cols
+            st.session_state['model_version'] = model_version
+            st.session_state['model_trained'] = True
+            st.session_state['model_data_version'] = data_version
+            st.session_state['trained_until'] = df['Date'].max()
+
+    if st.session_state.get('model_data_version', data_version) != data_version:
+        # New data since the models were fitted: refresh rather than retrain from scratch
+        with st.spinner(t('training_models')):
+            refresh_models(df, data_version)
+    model_version = st.session_state['model_version']
+    lang = st.session_state['language']
+
+    # Precomputed risk / forecasts: the batch job is queued whenever models are trained
+    # or refreshed; until the snapshot matches the current versions, tabs score live
+    snapshots = get_snapshot_store()
+
+    ctx = {
+        'df': df,
+        'district': selected_district,
+        'district_df': district_df,
+        'latest_data': latest_data,
+        'data_date': str(df['Date'].max().date()),
+        'data_version': data_version,
+        'model_version': model_version,
+        'clf': st.session_state['clf'],
+        'reg': st.session_state['reg'],
+        'metrics': st.session_state['metrics'],
+        'feat_cols': st.session_state['feat_cols'],
+        'snapshot': snapshots.lookup(selected_district, data_version, model_version),
+        # Figures are cached on (figure, district, language, data version, model version);
+        # district-independent figures use district=None so they survive a district switch.
+        'district_key': (selected_district, lang, data_version, model_version),
+        'region_key': (None, lang, data_version, model_version),
+    }
+
+    render_header_metrics(ctx)
+
+    # ------------------
+    # TABS (5 TABS)
+    # ------------------
+    tab_labels = [t('tab_overview'), t('tab_forecast'), t('tab_explain'), t('tab_map'), "🏗️ Groundwater Analysis"]
+    # The tab widget remembers its selection by label; after a language switch the
+    # old label is gone, so restore the same tab by position instead of resetting
+    if st.session_state.get('active_tab') not in tab_labels:
+        st.session_state['active_tab'] = tab_labels[st.session_state.get('active_tab_index', 0)]
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        tab_labels, key='active_tab', on_change='rerun' if LAZY_TABS else 'ignore'
+    )
+    st.session_state['active_tab_index'] = tab_labels.index(st.session_state['active_tab'])
+
+    # Closed tabs are skipped entirely; reopening one is served from the figure/data caches
+    # TAB 1: OVERVIEW
+    if tab_is_open(tab1):
+        with tab1:
+            render_overview_tab(ctx)
+
+    # TAB 2: FORECAST
+    if tab_is_open(tab2):
+        with tab2:
+            render_forecast_tab(ctx)
+
+    # TAB 3: EXPLAINABLE AI
+    if tab_is_open(tab3):
+        with tab3:
+            render_explain_tab(ctx)
+
+    # TAB 4: RISK MAP
+    if tab_is_open(tab4):
+        with tab4:
+            render_map_tab(ctx)
+
+    # TAB 5: GROUNDWATER ANALYSIS (NEW)
+    if tab_is_open(tab5):
+        with tab5:
+            render_groundwater_tab(ctx)
+
+    if SHOW_CACHE_STATS:
+        stats = get_figure_cache().stats()
+        st.sidebar.caption(f"⚡ Figure cache: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%})")
+
+    render_assistant(ctx)
 
 
 def login_page():
@@ -0,0 +1,115 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.inspection import permutation_importance, partial_dependence
+
+# -----------------------------------------------------------------------------
+# BACKGROUND MODEL DIAGNOSTICS
+# -----------------------------------------------------------------------------
+# Permutation importance and partial dependence are far too slow for the request
+# path, so they run on a worker pool and the dashboard polls for the result.
+# Tree prediction releases the GIL, so threads parallelise well and avoid
+# pickling the forests into another process.
+
+class DiagnosticsJob:
+    """Progress and result holder for one model version's diagnostics run."""
+
+    def __init__(self, total_steps):
+        self.total_steps = total_steps
+        self.completed_steps = 0
+        self.result = None
+        self.error = None
+        self.future = None
+
+    @property
+    def progress(self):
+        return self.completed_steps / self.total_steps
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class DiagnosticsRunner:
+    """
+    Computes diagnostics off the request path and keeps results keyed by model hash,
+    for the last max_versions model versions (every refresh makes a new version).
+    """
+
+    def __init__(self, max_workers=2, max_versions=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='diagnostics')
+        self._jobs = OrderedDict()
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+
+    def get(self, model_version):
+        """The job for this version, or None. A failed job is returned once and then forgotten, so it is retried."""
+        with self._lock:
+            job = self._jobs.get(model_version)
+            if job is None:
+                return None
+            self._jobs.move_to_end(model_version)
+            if job.error is not None:
+                del self._jobs[model_version]
+            return job
+
+    def submit(self, model_version, clf, reg, X, y_risk, y_gap, grid_resolution=20):
+        """Starts a diagnostics run unless one already exists (and has not failed) for this model version."""
+        with self._lock:
+            job = self._jobs.get(model_version)
+            if job is not None and job.error is None:
+                self._jobs.move_to_end(model_version)
+                return job
+            job = DiagnosticsJob(total_steps=2 + X.shape[1])
+            job.future = self._executor.submit(
+                _run_diagnostics, job, clf, reg, X, y_risk, y_gap, grid_resolution
+            )
+            self._jobs[model_version] = job
+            # Oldest versions go first; a run still in progress finishes but is no longer kept
+            while len(self._jobs) > self.max_versions:
+                self._jobs.popitem(last=False)
+            return job
+
+
+def _importance_frame(features, result):
+    return pd.DataFrame({
+        'Feature': features,
+        'Importance': result.importances_mean,
+        'Std': result.importances_std,
+    }).sort_values('Importance')
+
+
+def _run_diagnostics(job, clf, reg, X, y_risk, y_gap, grid_resolution):
+    """Worker body: one step per importance model, then one per PDP feature."""
+    try:
+        # PDP refuses integer columns (e.g. Month) to avoid silent grid rounding
+        X = X.astype(float)
+        features = list(X.columns)
+        risk_pi = permutation_importance(clf, X, y_risk, n_repeats=5, random_state=42)
+        job.completed_steps += 1
+        gap_pi = permutation_importance(reg, X, y_gap, n_repeats=5, random_state=42)
+        job.completed_steps += 1
+
+        pdp = {}
+        for i, feature in enumerate(features):
+            risk_pd = partial_dependence(clf, X, [i], grid_resolution=grid_resolution, kind='average')
+            gap_pd = partial_dependence(reg, X, [i], grid_resolution=grid_resolution, kind='average')
+            pdp[feature] = {
+                'grid': np.asarray(risk_pd['grid_values'][0]),
+                'risk': np.asarray(risk_pd['average']),      # (n_classes, grid)
+                'gap': np.asarray(gap_pd['average'][0]),     # (grid,)
+                'gap_grid': np.asarray(gap_pd['grid_values'][0]),
+            }
+            job.completed_steps += 1
+
+        job.result = {
+            'risk_importance': _importance_frame(features, risk_pi),
+            'gap_importance': _importance_frame(features, gap_pi),
+            'pdp': pdp,
+            'classes': list(clf.classes_),
+        }
+    except Exception as exc:
+        job.error = exc
+        raise
@@ -0,0 +1,90 @@
+import numpy as np
+from scipy import sparse
+
+# -----------------------------------------------------------------------------
+# TREE-PATH DECOMPOSITION (per-prediction feature contributions)
+# -----------------------------------------------------------------------------
+def _node_values(tree, is_classifier):
+    """Node outputs as (n_nodes, n_outputs) - class probabilities or regression means."""
+    values = tree.value[:, 0, :]
+    if is_classifier:
+        values = values / values.sum(axis=1, keepdims=True)
+    return values
+
+
+def _path_delta_matrix(forest, n_features, n_out):
+    """
+    Builds one sparse (total_nodes, n_features * n_out) matrix for the whole forest.
+    Each non-root node holds the change in output caused by the split at its parent,
+    filed under the parent's split feature. Summing the rows along a decision path
+    therefore gives that tree's per-feature contribution for a sample.
+    """
+    is_classifier = hasattr(forest, 'classes_')
+    rows, cols, data, biases = [], [], [], []
+    offset = 0
+    for est in forest.estimators_:
+        tree = est.tree_
+        values = _node_values(tree, is_classifier)
+        n_nodes = tree.node_count
+
+        parent = np.full(n_nodes, -1)
+        internal = np.flatnonzero(tree.children_left >= 0)
+        parent[tree.children_left[internal]] = internal
+        parent[tree.children_right[internal]] = internal
+
+        child = np.flatnonzero(parent >= 0)
+        delta = values[child] - values[parent[child]]
+        split_feat = tree.feature[parent[child]]
+
+        rows.append(np.repeat(child + offset, n_out))
+        cols.append((split_feat[:, None] * n_out + np.arange(n_out)).ravel())
+        data.append(delta.ravel())
+        biases.append(values[0])
+        offset += n_nodes
+
+    delta_matrix = sparse.csr_matrix(
+        (np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(offset, n_features * n_out)
+    )
+    return delta_matrix, np.mean(biases, axis=0)
+
+
+def tree_contributions(forest, X):
+    """
+    Decomposes a fitted random forest's predictions into bias + per-feature contributions
+    for every row of X in one batched pass (Saabas tree-path decomposition).
+
+    Returns (bias, contributions, prediction):
+        bias          -> (n_out,)                      forest output at the root
+        contributions -> (n_samples, n_features, n_out)
+        prediction    -> (n_samples, n_out)            == bias + contributions.sum(axis=1)
+    For a regressor n_out is 1; for a classifier it is the number of classes.
+    """
+    n_features = X.shape[1]
+    n_out = len(forest.classes_) if hasattr(forest, 'classes_') else 1
+
+    delta_matrix, bias = _path_delta_matrix(forest, n_features, n_out)
+    indicator, _ = forest.decision_path(X)
+
+    contrib = (indicator @ delta_matrix).toarray() / len(forest.estimators_)
+    contrib = contrib.reshape(X.shape[0], n_features, n_out)
+    prediction = bias + contrib.sum(axis=1)
+    return bias, contrib, prediction
+
+
+def explain_latest(clf, reg, latest_all, feature_cols):
+    """Risk and gap attributions for each district's latest row, as plain arrays."""
+    X = latest_all[feature_cols]
+    risk_bias, risk_contrib, risk_proba = tree_contributions(clf, X)
+    gap_bias, gap_contrib, gap_pred = tree_contributions(reg, X)
+    return {
+        'districts': latest_all['District'].tolist(),
+        'features': list(feature_cols),
+        'classes': list(clf.classes_),
+        'risk_bias': risk_bias,
+        'risk_contrib': risk_contrib,
+        'risk_proba': risk_proba,
+        'gap_bias': gap_bias[0],
+        'gap_contrib': gap_contrib[:, :, 0],
+        'gap_pred': gap_pred[:, 0],
+    }
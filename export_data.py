@@ -1,77 +1,167 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import os
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def generate_synthetic_data():
-    """Generates realistic synthetic data with exact labels requested by the user."""
-    districts = ['Rajkot', 'Jamnagar', 'Junagadh', 'Amreli', 'Bhavnagar', 'Porbandar', 'Morbi', 'Dwarka']
-    
-    AVG_RECHARGE_RATE = 0.05 
-    AVG_EXTRACTION_RATE = 0.12
-    
-    start_date = datetime(2020, 1, 1)
-    end_date = datetime(2025, 12, 31)
-    dates = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    data = []
-    
-    for district in districts:
-        if district in ['Junagadh', 'Amreli']:
-            ext_wells = np.random.randint(150, 300)
-            rech_wells = np.random.randint(50, 100)
-        else:
-            ext_wells = np.random.randint(300, 500)
-            rech_wells = np.random.randint(20, 60)
-            
-        for date in dates:
-            month = date.month
-            is_monsoon = 6 <= month <= 9
-            
-            if is_monsoon:
-                daily_rain = np.random.gamma(shape=2, scale=10) if np.random.rand() > 0.3 else 0
-            else:
-                daily_rain = np.random.gamma(shape=1, scale=2) if np.random.rand() > 0.9 else 0
-            
-            gw_level = 15 + (np.sin(date.dayofyear / 365 * 2 * np.pi) * 5) + np.random.normal(0, 0.5)
-            gw_level = max(2, gw_level)
-            
-            res_level = 40 + (30 if is_monsoon else -30) * (date.dayofyear % 365 / 365) + np.random.normal(0, 5)
-            res_level = max(0, min(100, res_level))
-            
-            # Calculations for the CSV
-            nat_rech = daily_rain * 0.1 # Real-time rain contribution
-            art_rech = rech_wells * AVG_RECHARGE_RATE
-            total_rech = nat_rech + art_rech
-            extraction = ext_wells * AVG_EXTRACTION_RATE
-            net_change = total_rech - extraction
-            
-            # Stress Classification Logic
-            if gw_level < 12 and net_change >= 0:
-                stress_label = "Safe"
-            elif gw_level > 20 and net_change < -5:
-                stress_label = "Critical"
-            else:
-                stress_label = "Warning"
-
-            data.append({
-                'Date': date,
-                'District': district,
-                'Rainfall_mm': round(daily_rain, 1),
-                'Groundwater_Level_mbgl': round(gw_level, 2),
-                'Reservoir_Level_pct': round(res_level, 1),
-                'Extraction Borewells': ext_wells,
-                'Recharge Borewells': rech_wells,
-                'Groundwater Stress Classification': stress_label,
-                'Net Groundwater Change MLD': round(net_change, 2),
-                'Groundwater Recovery MLD': round(total_rech, 2),
-                'Groundwater Extraction MLD': round(extraction, 2)
-            })
-            
-    df = pd.DataFrame(data)
-    return df
+from hierarchy import SAURASHTRA
+from versioning import data_fingerprint
+import feature_store
+import water_balance
+import water_data
+
+# Exported columns, in the same schema (names and definitions) as the dashboard:
+# everything derived comes from the shared feature store.
+EXPORT_COLUMNS = ['Date', 'District', 'Rainfall_mm', 'Groundwater_Level_mbgl', 'Reservoir_Level_pct',
+                  'extraction_borewells', 'recharge_borewells', 'groundwater_status',
+                  'Net_GW_Change_MLD', 'Total_Recharge_MLD', 'Extraction_MLD']
+ROUNDING = {'Rainfall_mm': 1, 'Groundwater_Level_mbgl': 2, 'Reservoir_Level_pct': 1,
+            'Net_GW_Change_MLD': 2, 'Total_Recharge_MLD': 2, 'Extraction_MLD': 2}
+START_DATE, END_DATE = datetime(2020, 1, 1), datetime(2025, 12, 31)
+# Code the export is generated from: editing any of these can change its contents
+SOURCE_FILES = [__file__, water_data.__file__, water_balance.__file__, feature_store.__file__]
+
+
+def generate_synthetic_data(hierarchy=SAURASHTRA, seed=None):
+    """Generates the export dataset; only the exported features are computed."""
+    # A fixed seed makes reruns reproducible, so unchanged partitions are not rewritten
+    rng = np.random if seed is None else np.random.default_rng(seed)
+    raw = water_data.generate_raw_data(hierarchy, START_DATE, END_DATE, rng=rng)
+    derived = [c for c in EXPORT_COLUMNS if c not in raw]
+    df = raw.assign(**water_data.FEATURE_STORE.compute(raw, derived))
+    df = water_data.fill_warmup(df[EXPORT_COLUMNS].copy())
+    return df.round(ROUNDING)
+
+
+def input_fingerprint(seed, hierarchy=SAURASHTRA):
+    """
+    Short hash of everything a seeded export is generated from (seed, date range,
+    districts and generating code), or None when unseeded and so not reproducible.
+    """
+    if seed is None:
+        return None
+    h = hashlib.blake2b(digest_size=8)
+    h.update(repr((seed, START_DATE, END_DATE)).encode())
+    h.update(data_fingerprint(hierarchy.table('district')).encode())
+    for path in SOURCE_FILES:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+# -----------------------------------------------------------------------------
+# PARTITIONED, INCREMENTAL EXPORT
+# -----------------------------------------------------------------------------
+# One CSV per district and year (district=<name>/year=<yyyy>/part.csv) plus a
+# manifest.json with each partition's row count, content checksum and input
+# fingerprint. On rerun, if every partition was exported from the same inputs
+# (input_fingerprint) and its file is present, nothing is regenerated at all.
+# Otherwise the data is regenerated as a whole - one random stream feeds every
+# district and year, so a single partition cannot be rebuilt on its own - and a
+# partition is only rewritten when its checksum changed or its file is missing,
+# with the changed partitions written concurrently.
+
+MANIFEST = 'manifest.json'
+
+
+def _write_partition(output_dir, rel_path, part):
+    path = os.path.join(output_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    part.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return rel_path
+
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {'partitions': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def is_current(output_dir, input_version):
+    """True if every exported partition was generated from `input_version` and is still on disk."""
+    partitions = load_manifest(output_dir)['partitions']
+    return input_version is not None and bool(partitions) and all(
+        entry.get('input_version') == input_version and os.path.exists(os.path.join(output_dir, entry['path']))
+        for entry in partitions.values()
+    )
+
+
+def export_partitioned(df, output_dir='saurashtra_export', max_workers=8, input_version=None):
+    """
+    Writes df partitioned by district and year; returns (written, skipped, removed) partition keys.
+    `input_version` (see input_fingerprint) is recorded per partition for is_current.
+    The manifest is replaced last, so it only ever describes fully written files.
+    """
+    old = load_manifest(output_dir)['partitions']
+    years = df['Date'].dt.year
+    partitions = {}
+    for (district, year), part in df.groupby([df['District'], years], sort=True):
+        key = f"district={district}/year={year}"
+        partitions[key] = part.reset_index(drop=True)
+
+    entries, changed = {}, []
+    for key, part in partitions.items():
+        entry = {
+            'path': f"{key}/part.csv",
+            'rows': len(part),
+            'checksum': data_fingerprint(part),
+            'first_date': f"{part['Date'].min():%Y-%m-%d}",
+            'last_date': f"{part['Date'].max():%Y-%m-%d}",
+            'input_version': input_version,
+        }
+        previous = old.get(key)
+        unchanged = (previous is not None and previous['checksum'] == entry['checksum']
+                     and os.path.exists(os.path.join(output_dir, entry['path'])))
+        if not unchanged:
+            changed.append(key)
+        entries[key] = entry
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(lambda key: _write_partition(output_dir, entries[key]['path'], partitions[key]), changed))
+
+    # Partitions that no longer exist in the data
+    removed = [key for key in old if key not in entries]
+    for key in removed:
+        path = os.path.join(output_dir, old[key]['path'])
+        if os.path.exists(path):
+            os.remove(path)
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'total_rows': int(sum(e['rows'] for e in entries.values())),
+        'partitions': entries,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = os.path.join(output_dir, MANIFEST + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, MANIFEST))
+    return changed, [key for key in entries if key not in changed], removed
+
 
 if __name__ == "__main__":
-    print("Regenerating refined dataset with exact labels...")
-    df = generate_synthetic_data()
-    df.to_csv('saurashtra_water_data.csv', index=False)
-    print("Done! CSV updated with 'Extraction Borewells', 'Recharge Borewells', and 'Groundwater Stress Classification'.")
+    parser = argparse.ArgumentParser(description="Export the synthetic dataset.")
+    parser.add_argument('--output-dir', default='saurashtra_export')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--single-csv', action='store_true', help="also write the monolithic saurashtra_water_data.csv")
+    args = parser.parse_args()
+
+    start = time.time()
+    input_version = input_fingerprint(args.seed)
+    if not args.single_csv and is_current(args.output_dir, input_version):
+        print(f"Inputs unchanged since the last export; nothing regenerated ({args.output_dir}/{MANIFEST}).")
+    else:
+        print("Regenerating refined dataset with exact labels...")
+        df = generate_synthetic_data(seed=args.seed)
+        written, skipped, removed = export_partitioned(df, args.output_dir, args.workers, input_version)
+        if args.single_csv:
+            df.to_csv('saurashtra_water_data.csv', index=False)
+        print(f"Done in {time.time() - start:.1f}s: {len(written)} partitions written, "
+              f"{len(skipped)} unchanged, {len(removed)} removed ({args.output_dir}/{MANIFEST}).")
@@ -0,0 +1,120 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+import rolling
+
+# -----------------------------------------------------------------------------
+# FEATURE STORE (declared once, computed on demand in dependency order)
+# -----------------------------------------------------------------------------
+# Every engineered column is declared once: its name(s), the columns it reads and
+# how to compute it. A consumer asks for the columns it needs; the store works out
+# the dependencies, computes only those, in order, and batches all windowed
+# features that are ready into one rolling-engine pass. Materialized columns can be
+# cached per data version, so the dashboard, the export and training share one
+# computation instead of each carrying its own copy of the logic.
+
+
+class Feature:
+    """
+    One declared feature. `outputs` is a column name or a tuple of names produced
+    together. Either `compute(frame, scale) -> value(s)` reads the `inputs` columns
+    of `frame` (scale is the unit's share of its district, for features that scale
+    with area), or `window=(window, stat)` makes it a rolling feature of its single
+    input, computed by the rolling engine.
+    """
+
+    def __init__(self, outputs, inputs, compute=None, window=None):
+        self.outputs = (outputs,) if isinstance(outputs, str) else tuple(outputs)
+        self.inputs = list(inputs)
+        self.compute = compute
+        self.window = window
+
+
+class FeatureStore:
+    """Resolves, computes and (optionally) caches declared features."""
+
+    def __init__(self, features, max_versions=2):
+        self.features = list(features)
+        self.by_output = {name: f for f in self.features for name in f.outputs}
+        self.max_versions = max_versions
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def plan(self, names, available=()):
+        """Features to compute for `names`, dependencies first. Inputs in `available` are not recomputed."""
+        order, seen = [], set()
+
+        def visit(name, requested):
+            # Dependencies that already exist are inputs; requested columns are (re)computed
+            if name in available and (not requested or name not in self.by_output):
+                return
+            if name not in self.by_output:
+                raise KeyError(f"No feature or input column named {name!r}")
+            feature = self.by_output[name]
+            if id(feature) in seen:
+                return
+            seen.add(id(feature))
+            for dep in feature.inputs:
+                visit(dep, False)
+            order.append(feature)
+
+        for name in names:
+            visit(name, True)
+        return order
+
+    def compute(self, df, names, unit_col='District', scale=1.0, known=None):
+        """
+        Computes the requested columns of df (and whatever they depend on that df
+        does not already have). Returns {column: array} for everything computed.
+        Columns in `known` are used as inputs as they are.
+        """
+        known = {} if known is None else known
+        cols = {}
+
+        def column(name):
+            if name in cols:
+                return cols[name]
+            return known[name] if name in known else df[name]
+
+        plan = self.plan([n for n in names if n not in known], set(df.columns) | set(known))
+        done = set()
+        for i, feature in enumerate(plan):
+            if id(feature) in done:
+                continue
+            if feature.window is not None:
+                # Every windowed feature whose input is ready goes into one engine pass
+                ready = [f for f in plan[i:] if f.window is not None and id(f) not in done
+                         and all(d in cols or d in known or d in df for d in f.inputs)]
+                units = [unit_col] if isinstance(unit_col, str) else list(unit_col)
+                frame = pd.DataFrame({c: column(c) for c in units + list({f.inputs[0] for f in ready})})
+                specs = {f.outputs[0]: (f.inputs[0],) + tuple(f.window) for f in ready}
+                result = rolling.window_features(frame, specs, unit_col)
+                for f in ready:
+                    cols[f.outputs[0]] = result[f.outputs[0]].to_numpy()
+                    done.add(id(f))
+                continue
+            frame = pd.DataFrame({c: np.asarray(column(c)) for c in feature.inputs})
+            values = feature.compute(frame, scale)
+            values = values if len(feature.outputs) > 1 else (values,)
+            for name, value in zip(feature.outputs, values):
+                cols[name] = np.asarray(value)
+            done.add(id(feature))
+        return cols
+
+    def get(self, df, names, data_version, unit_col='District'):
+        """
+        The requested columns for df, computed at most once per data version:
+        columns already materialized for this version (and their dependencies)
+        are reused, only the missing ones are computed.
+        """
+        with self._lock:
+            cached = self._cache.setdefault(data_version, {})
+            self._cache.move_to_end(data_version)
+            while len(self._cache) > self.max_versions:
+                self._cache.popitem(last=False)
+            missing = [n for n in names if n not in cached]
+            if missing:
+                cached.update(self.compute(df, missing, unit_col, known=cached))
+            return {name: cached[name] for name in names}
@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+import plotly.io as pio
+
+# -----------------------------------------------------------------------------
+# FIGURE CACHE
+# -----------------------------------------------------------------------------
+# Plotly figure construction (px.* in particular) dominates a dashboard rerun.
+# Figures are stored as serialized JSON specs so cached entries can never be
+# mutated by a caller, and are rehydrated on a hit without rebuilding traces.
+
+class FigureCache:
+    """Thread-safe LRU cache of serialized Plotly figures with hit/miss counters."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._specs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        """Returns the cached figure for key, calling builder() only on a miss."""
+        with self._lock:
+            spec = self._specs.get(key)
+            if spec is not None:
+                self._specs.move_to_end(key)
+                self.hits += 1
+        if spec is None:
+            spec = builder().to_json()
+            with self._lock:
+                self.misses += 1
+                self._specs[key] = spec
+                self._specs.move_to_end(key)
+                while len(self._specs) > self.max_entries:
+                    self._specs.popitem(last=False)
+        return pio.from_json(spec, skip_invalid=True)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._specs),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._specs.clear()
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# -----------------------------------------------------------------------------
+# SPATIAL HIERARCHY (District -> Taluka -> Village)
+# -----------------------------------------------------------------------------
+# Every spatial unit is an integer id (its row position in the level table) and
+# points at its parent by id, so roll-ups and drill-downs are plain array
+# indexing - no per-unit Python loops, whether there are 8 units or 10,000.
+
+LEVELS = ['district', 'taluka', 'village']
+
+# name, lat, lon, wet_zone (higher rainfall / fewer extraction wells), base demand (MLD)
+SAURASHTRA_DISTRICTS = [
+    ('Rajkot', 22.30, 70.80, False, 200),
+    ('Jamnagar', 22.47, 70.05, False, 100),
+    ('Junagadh', 21.52, 70.45, True, 100),
+    ('Amreli', 21.60, 71.22, True, 100),
+    ('Bhavnagar', 21.76, 72.15, False, 200),
+    ('Porbandar', 21.64, 69.62, False, 100),
+    ('Morbi', 22.81, 70.83, False, 100),
+    ('Dwarka', 22.24, 68.96, False, 100),
+]
+
+
+class SpatialHierarchy:
+    """Integer-coded district/taluka/village tree with one attribute table per level."""
+
+    def __init__(self, tables):
+        # tables[level] is a DataFrame indexed 0..n-1 with 'name', 'parent_id', 'lat', 'lon'
+        self.tables = tables
+        self._indicators = {}
+
+    def table(self, level):
+        return self.tables[level]
+
+    def size(self, level):
+        return len(self.tables[level])
+
+    def names(self, level):
+        return self.tables[level]['name'].tolist()
+
+    def ancestor_ids(self, level, to_level):
+        """Maps every unit at `level` to the id of its ancestor at `to_level`."""
+        ids = np.arange(self.size(level))
+        for step in range(LEVELS.index(level), LEVELS.index(to_level), -1):
+            ids = self.tables[LEVELS[step]]['parent_id'].to_numpy()[ids]
+        return ids
+
+    def children(self, level, parent_level, parent_id):
+        """Ids of all units at `level` that sit under `parent_id` at `parent_level`."""
+        return np.flatnonzero(self.ancestor_ids(level, parent_level) == parent_id)
+
+    def _indicator(self, level, to_level):
+        """Sparse (n_parent, n_child) membership matrix, built once per level pair."""
+        key = (level, to_level)
+        if key not in self._indicators:
+            parents = self.ancestor_ids(level, to_level)
+            n_child = len(parents)
+            self._indicators[key] = sparse.csr_matrix(
+                (np.ones(n_child), (parents, np.arange(n_child))),
+                shape=(self.size(to_level), n_child)
+            )
+        return self._indicators[key]
+
+    def rollup(self, values, level, to_level, how='sum', weights=None):
+        """
+        Aggregates per-unit values (shape (n_units, ...)) up to an ancestor level.
+        how: 'sum', 'mean' (optionally weighted), 'max' or 'min'.
+        """
+        values = np.asarray(values, dtype=float)
+        if level == to_level:
+            return values
+        if how in ('sum', 'mean'):
+            M = self._indicator(level, to_level)
+            flat = values.reshape(len(values), -1)
+            if how == 'sum':
+                out = M @ flat
+            else:
+                w = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+                out = (M @ (flat * w[:, None])) / (M @ w)[:, None]
+            return out.reshape((self.size(to_level),) + values.shape[1:])
+
+        parents = self.ancestor_ids(level, to_level)
+        fill = -np.inf if how == 'max' else np.inf
+        out = np.full((self.size(to_level),) + values.shape[1:], fill)
+        (np.maximum if how == 'max' else np.minimum).at(out, parents, values)
+        return out
+
+    def rollup_frame(self, df, level, to_level, aggs):
+        """
+        DataFrame roll-up: df carries an f'{level}_id' column; aggs maps column -> how.
+        Returns one row per `to_level` unit with its id, name and the aggregated columns.
+        """
+        ids = df[f'{level}_id'].to_numpy()
+        order = np.argsort(ids)
+        if not np.array_equal(ids[order], np.arange(self.size(level))):
+            raise ValueError(f"rollup_frame expects exactly one row per {level}")
+        out = self.tables[to_level][['name', 'lat', 'lon']].copy()
+        out.insert(0, f'{to_level}_id', np.arange(self.size(to_level)))
+        for col, how in aggs.items():
+            out[col] = self.rollup(df[col].to_numpy()[order], level, to_level, how)
+        return out
+
+
+def build_saurashtra_hierarchy(talukas_per_district=6, villages_per_taluka=20, seed=42):
+    """
+    Builds the Saurashtra hierarchy. Districts are real; talukas and villages are
+    synthetic units scattered around their parent's centroid with static attributes
+    (borewell counts, population share, local rainfall / aquifer modifiers).
+    """
+    rng = np.random.default_rng(seed)
+
+    districts = pd.DataFrame(SAURASHTRA_DISTRICTS, columns=['name', 'lat', 'lon', 'wet_zone', 'base_demand'])
+    districts.insert(1, 'parent_id', -1)
+    n_d = len(districts)
+
+    # Talukas around each district centroid
+    t_parent = np.repeat(np.arange(n_d), talukas_per_district)
+    t_num = np.tile(np.arange(1, talukas_per_district + 1), n_d)
+    talukas = pd.DataFrame({
+        'name': districts['name'].to_numpy()[t_parent] + ' T' + t_num.astype(str),
+        'parent_id': t_parent,
+        'lat': districts['lat'].to_numpy()[t_parent] + rng.normal(0, 0.15, len(t_parent)),
+        'lon': districts['lon'].to_numpy()[t_parent] + rng.normal(0, 0.15, len(t_parent)),
+    })
+
+    # Villages around each taluka centre
+    v_parent = np.repeat(np.arange(len(talukas)), villages_per_taluka)
+    v_num = np.tile(np.arange(1, villages_per_taluka + 1), len(talukas))
+    n_v = len(v_parent)
+    v_district = t_parent[v_parent]
+    villages = pd.DataFrame({
+        'name': talukas['name'].to_numpy()[v_parent] + '-V' + v_num.astype(str),
+        'parent_id': v_parent,
+        'lat': talukas['lat'].to_numpy()[v_parent] + rng.normal(0, 0.05, n_v),
+        'lon': talukas['lon'].to_numpy()[v_parent] + rng.normal(0, 0.05, n_v),
+    })
+
+    # Population share within the district (Dirichlet via normalised gamma draws)
+    weight = rng.gamma(1.0, 1.0, n_v)
+    villages['population_share'] = weight / np.bincount(v_district, weights=weight)[v_district]
+
+    # District well targets keep the original ranges; villages get Poisson shares of them
+    wet = districts['wet_zone'].to_numpy()
+    ext_target = np.where(wet, rng.integers(150, 300, n_d), rng.integers(300, 500, n_d))
+    rech_target = np.where(wet, rng.integers(50, 100, n_d), rng.integers(20, 60, n_d))
+    villages['extraction_borewells'] = rng.poisson(ext_target[v_district] * villages['population_share'])
+    villages['recharge_borewells'] = rng.poisson(rech_target[v_district] * villages['population_share'])
+
+    # Local modifiers used to downscale district conditions to each village
+    villages['rain_factor'] = rng.lognormal(0, 0.25, n_v)
+    villages['gw_offset_m'] = rng.normal(0, 3, n_v)
+
+    hierarchy = SpatialHierarchy({'district': districts, 'taluka': talukas, 'village': villages})
+
+    # Coarser levels carry the rolled-up well counts so every level is self-consistent
+    for level in ('taluka', 'district'):
+        for col in ('extraction_borewells', 'recharge_borewells'):
+            hierarchy.tables[level][col] = hierarchy.rollup(villages[col], 'village', level).astype(int)
+    return hierarchy
+
+
+# Default hierarchy shared by the dashboard and the offline exporter
+SAURASHTRA = build_saurashtra_hierarchy()
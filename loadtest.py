@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+from streamlit.runtime.media_file_manager import MediaFileManager
+from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+# -----------------------------------------------------------------------------
+# CONCURRENT-SESSION LOAD TEST (headless, via Streamlit's AppTest)
+# -----------------------------------------------------------------------------
+# Every simulated operator is an AppTest session on its own thread inside this
+# process - the same shape as a Streamlit server, where sessions are threads that
+# share the process-wide caches. Each session scripts a realistic flow and every
+# rerun is timed. Concurrency is stepped up and, per step, the report gives
+# rerun latency percentiles, throughput, CPU use and resident memory.
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+DISTRICTS = ['Rajkot', 'Jamnagar', 'Junagadh', 'Amreli', 'Bhavnagar', 'Porbandar', 'Morbi', 'Dwarka']
+CHAT_PROMPTS = ['What is the rainfall in Rajkot?', 'How is the groundwater?', 'Show reservoir status', 'risk']
+
+# AppTest gives every run a throwaway media manager, so lazily generated downloads
+# (download_button with a callable) would be unreachable afterwards. Record the
+# callables as they are registered so the harness can "click" them like a browser.
+_deferred = {}
+_deferred_lock = threading.Lock()
+_add_deferred = MediaFileManager.add_deferred
+
+
+def _recording_add_deferred(self, data_callable, *args, **kwargs):
+    file_id = _add_deferred(self, data_callable, *args, **kwargs)
+    with _deferred_lock:
+        _deferred[file_id] = data_callable
+    return file_id
+
+
+MediaFileManager.add_deferred = _recording_add_deferred
+
+# AppTest also compiles the script afresh on every run. A server compiles it once
+# into a shared cache (and concurrent ast.parse calls are not thread-safe on some
+# Python versions), so all sessions here share one cache too.
+_script_cache = ScriptCache()
+_get_bytecode = ScriptCache.get_bytecode
+ScriptCache.get_bytecode = lambda self, script_path: _get_bytecode(_script_cache, script_path)
+
+
+def rss_mb():
+    """Current resident set size of this process (MB)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Fallback: peak RSS (KB on Linux, bytes on macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+class RssSampler:
+    """Samples RSS in the background and keeps the peak."""
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class Session:
+    """One simulated operator; records (step, seconds, ok) for every rerun."""
+
+    def __init__(self, user, password, timeout, seed):
+        self.at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        self.user = user
+        self.password = password
+        self.rng = random.Random(seed)
+        self.timings = []
+
+    def _step(self, name, action):
+        start = time.perf_counter()
+        try:
+            action()
+            ok = not self.at.exception
+        except Exception:
+            ok = False
+        self.timings.append((name, time.perf_counter() - start, ok))
+
+    def login(self):
+        at = self.at
+        self._step('open', at.run)
+        if self.user and self.password:
+            def submit():
+                at.text_input[0].set_value(self.user)
+                at.text_input[1].set_value(self.password)
+                at.button[0].click().run()
+            self._step('login', submit)
+        else:
+            # No credentials given: skip the form, exactly as a successful login would
+            def bypass():
+                at.session_state['logged_in'] = True
+                at.run()
+            self._step('login', bypass)
+
+    def switch_district(self):
+        self._step('district_switch', lambda: self.at.sidebar.selectbox[0].select(self.rng.choice(DISTRICTS)).run())
+
+    def toggle_language(self):
+        radio = self.at.sidebar.radio[0]
+        other = next(o for o in radio.options if o != radio.value)
+        self._step('language_toggle', lambda: radio.set_value(other).run())
+
+    def chat(self):
+        self._step('chat', lambda: self.at.chat_input[0].set_value(self.rng.choice(CHAT_PROMPTS)).run())
+
+    def download(self):
+        def fetch():
+            self.at.get('download_button')[0].click().run()
+            # The CSV is produced lazily, when the browser requests the file
+            file_id = self.at.get('download_button')[0].proto.deferred_file_id
+            with _deferred_lock:
+                data_callable = _deferred.pop(file_id)
+            data_callable()
+        self._step('download', fetch)
+
+    def run_flow(self, iterations):
+        self.login()
+        for _ in range(iterations):
+            self.switch_district()
+            self.toggle_language()
+            self.chat()
+            self.download()
+        return self.timings
+
+
+def run_level(n_sessions, iterations, user, password, timeout):
+    """Runs n_sessions concurrent flows; returns the summary for this concurrency level."""
+    sessions = [Session(user, password, timeout, seed=i) for i in range(n_sessions)]
+    cpu_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.perf_counter()
+    with RssSampler() as rss, ThreadPoolExecutor(max_workers=n_sessions) as pool:
+        results = list(pool.map(lambda s: s.run_flow(iterations), sessions))
+    wall = time.perf_counter() - wall_start
+    cpu_end = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (cpu_end.ru_utime - cpu_start.ru_utime) + (cpu_end.ru_stime - cpu_start.ru_stime)
+
+    timings = [t for session in results for t in session]
+    latencies = np.array([seconds for _, seconds, _ in timings]) * 1000
+    steps = sorted({name for name, _, _ in timings})
+    return {
+        'sessions': n_sessions,
+        'reruns': len(timings),
+        'errors': sum(not ok for _, _, ok in timings),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'reruns_per_s': len(timings) / wall,
+        'cpu_cores': cpu / wall,
+        'rss_peak_mb': rss.peak,
+        'step_p95_ms': {
+            step: float(np.percentile([s * 1000 for name, s, _ in timings if name == step], 95)) for step in steps
+        },
+    }
+
+
+def format_report(levels):
+    header = f"{'sessions':>8} {'reruns':>7} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rerun/s':>8} {'cpu':>5} {'rss MB':>7}"
+    lines = [header, '-' * len(header)]
+    for r in levels:
+        lines.append(f"{r['sessions']:>8} {r['reruns']:>7} {r['errors']:>6} {r['p50_ms']:>8.0f} {r['p95_ms']:>8.0f} "
+                     f"{r['p99_ms']:>8.0f} {r['reruns_per_s']:>8.1f} {r['cpu_cores']:>5.2f} {r['rss_peak_mb']:>7.0f}")
+    lines.append('')
+    lines.append('p95 by step (ms): ' + '; '.join(
+        f"{r['sessions']}: " + ', '.join(f"{k} {v:.0f}" for k, v in r['step_p95_ms'].items()) for r in levels))
+    return '\n'.join(lines)
+
+
+def compare(levels, baseline, max_regression):
+    """Levels whose p95 grew more than max_regression (fraction) over the baseline run."""
+    base = {r['sessions']: r for r in baseline['levels']}
+    return [(r['sessions'], base[r['sessions']]['p95_ms'], r['p95_ms']) for r in levels
+            if r['sessions'] in base and r['p95_ms'] > base[r['sessions']]['p95_ms'] * (1 + max_regression)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the dashboard.")
+    parser.add_argument('--sessions', default='1,2,4,8', help="comma-separated concurrency levels")
+    parser.add_argument('--iterations', type=int, default=3, help="flow repetitions per session")
+    parser.add_argument('--timeout', type=float, default=300, help="per-rerun timeout (s)")
+    parser.add_argument('--json', help="write the results to this file")
+    parser.add_argument('--baseline', help="earlier --json output to compare p95 against")
+    parser.add_argument('--max-regression', type=float, default=0.25, help="allowed p95 growth vs baseline")
+    args = parser.parse_args()
+
+    # Credentials come from the environment; without them the login form is bypassed
+    user, password = os.environ.get('LOADTEST_USER'), os.environ.get('LOADTEST_PASSWORD')
+
+    # Warm-up: one session fills the process-wide caches (data, models, figures)
+    warm_start = time.perf_counter()
+    Session(user, password, args.timeout, seed=-1).run_flow(1)
+    print(f"Warm-up (cold caches): {time.perf_counter() - warm_start:.1f}s, RSS {rss_mb():.0f} MB\n")
+
+    levels = [run_level(int(n), args.iterations, user, password, args.timeout) for n in args.sessions.split(',')]
+    print(format_report(levels))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'iterations': args.iterations, 'levels': levels}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(levels, json.load(f), args.max_regression)
+        for sessions, before, after in regressions:
+            print(f"REGRESSION at {sessions} sessions: p95 {before:.0f} ms -> {after:.0f} ms")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,142 @@
+import argparse
+import copy
+import time
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, mean_absolute_error
+
+import water_data
+
+# -----------------------------------------------------------------------------
+# INCREMENTAL MODEL REFRESH (warm-started forests with a drift check)
+# -----------------------------------------------------------------------------
+# A full fit grows with the whole history. When new data arrives the forests are
+# instead extended with a few trees grown on a recent window (sklearn warm_start)
+# and the oldest trees are retired, so the forest keeps a fixed size and drifts
+# towards current conditions. Before refreshing, the current models are scored on
+# the rows they have not seen. The full fit's random-split test metrics are too
+# optimistic for that comparison (neighbouring days leak between train and test),
+# so the first unseen batch after a full fit sets an out-of-time reference; when
+# a later batch is worse than the reference beyond a tolerance, the models are
+# retrained in full instead.
+
+N_ESTIMATORS = 100
+REFRESH_TREES = 20          # trees added per refresh (and retired from the front)
+RECENT_DAYS = 365           # window the new trees are grown on
+ACC_TOLERANCE = 0.05        # absolute drop in risk accuracy that counts as drift
+MAE_TOLERANCE = 0.25        # relative growth of the gap MAE that counts as drift
+
+
+def train_full(df, feature_cols=water_data.MODEL_FEATURES, n_estimators=N_ESTIMATORS, random_state=42):
+    """Full fit of both forests on the whole history; returns clf, reg, test accuracy and MAE."""
+    X = df[list(feature_cols)]
+    y_risk = df[water_data.RISK_TARGET]
+    y_gap = df[water_data.GAP_TARGET]
+
+    X_train, X_test, y_train_risk, y_test_risk, y_train_gap, y_test_gap = train_test_split(
+        X, y_risk, y_gap, test_size=0.2, random_state=random_state
+    )
+    clf = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    clf.fit(X_train, y_train_risk)
+    reg = RandomForestRegressor(n_estimators=n_estimators, random_state=random_state)
+    reg.fit(X_train, y_train_gap)
+
+    acc = accuracy_score(y_test_risk, clf.predict(X_test))
+    mae = mean_absolute_error(y_test_gap, reg.predict(X_test))
+    return clf, reg, acc, mae
+
+
+def extend_forest(model, X, y, n_new=REFRESH_TREES, max_trees=N_ESTIMATORS):
+    """
+    A copy of a fitted forest with n_new trees grown on (X, y) and only the newest
+    max_trees kept. The original is untouched, so threads still scoring with it
+    (diagnostics, snapshots) never see a half-updated forest.
+    """
+    model = copy.deepcopy(model)
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_new)
+    model.fit(X, y)
+    model.estimators_ = model.estimators_[-max_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    return model
+
+
+def evaluate(clf, reg, df, feature_cols=water_data.MODEL_FEATURES):
+    """(risk accuracy, gap MAE) of the models on df."""
+    X = df[list(feature_cols)]
+    return (accuracy_score(df[water_data.RISK_TARGET], clf.predict(X)),
+            mean_absolute_error(df[water_data.GAP_TARGET], reg.predict(X)))
+
+
+def has_drifted(recent, baseline, acc_tolerance=ACC_TOLERANCE, mae_tolerance=MAE_TOLERANCE):
+    """True when recent (acc, mae) is worse than the baseline by more than the tolerances."""
+    return recent[0] < baseline[0] - acc_tolerance or recent[1] > baseline[1] * (1 + mae_tolerance)
+
+
+def refresh_models(clf, reg, df, trained_until, reference=None, feature_cols=water_data.MODEL_FEATURES,
+                   recent_days=RECENT_DAYS, n_new=REFRESH_TREES):
+    """
+    Brings the models up to date with df. Rows after `trained_until` are new; if
+    there are none (the history was replaced rather than appended to), the last
+    recent_days are checked instead. `reference` is the out-of-time (acc, mae)
+    returned by the previous call (None right after a full fit).
+
+    Returns (clf, reg, mode, recent, reference, metrics): mode is 'refresh' (extended
+    copies) or 'full' (new models) - the models passed in are never modified; recent is the old models' (acc, mae)
+    on the new rows, reference is what to pass next time and metrics is the full
+    fit's test (acc, mae), or None after a refresh.
+    """
+    last = df['Date'].max()
+    window = df[df['Date'] > last - pd.Timedelta(days=recent_days)]
+    new = df[df['Date'] > trained_until]
+    recent = evaluate(clf, reg, new if len(new) else window, feature_cols)
+
+    # A warm-started classifier must see every class the forest already predicts
+    same_classes = set(np.unique(window[water_data.RISK_TARGET])) == set(clf.classes_)
+    if (reference is not None and has_drifted(recent, reference)) or not same_classes:
+        clf, reg, acc, mae = train_full(df, feature_cols, n_estimators=len(clf.estimators_))
+        return clf, reg, 'full', recent, None, (acc, mae)
+
+    X = window[list(feature_cols)]
+    clf = extend_forest(clf, X, window[water_data.RISK_TARGET], n_new)
+    reg = extend_forest(reg, X, window[water_data.GAP_TARGET], n_new)
+    return clf, reg, 'refresh', recent, recent if reference is None else reference, None
+
+
+def benchmark(years=(6, 12, 24), appends=4, append_days=90, seed=7):
+    """
+    Replays `appends` batches of append_days onto histories of several lengths:
+    one full fit before the first batch, then a refresh per batch, each timed
+    against a full fit on the same data.
+    """
+    rows = []
+    for n_years in years:
+        np.random.seed(seed)
+        start = pd.Timestamp('2026-01-01') - pd.DateOffset(years=n_years)
+        df = water_data.generate_synthetic_data(start_date=start, end_date=pd.Timestamp('2025-12-31'))
+        cutoffs = [df['Date'].max() - pd.Timedelta(days=append_days * k) for k in range(appends, -1, -1)]
+        clf, reg, _, _ = train_full(df[df['Date'] <= cutoffs[0]])
+        reference = None
+        for trained_until, until in zip(cutoffs[:-1], cutoffs[1:]):
+            seen = df[df['Date'] <= until]
+            t = time.perf_counter()
+            clf, reg, mode, recent, reference, _ = refresh_models(clf, reg, seen, trained_until, reference)
+            refresh_s = time.perf_counter() - t
+            t = time.perf_counter()
+            train_full(seen)
+            full_s = time.perf_counter() - t
+            rows.append({'history_rows': len(seen), 'until': f"{until:%Y-%m-%d}", 'mode': mode,
+                         'full_fit_s': full_s, 'refresh_s': refresh_s, 'speedup': full_s / refresh_s,
+                         'acc_before': recent[0], 'mae_before': recent[1]})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark incremental model refresh against a full retrain.")
+    parser.add_argument('--years', default='6,12,24', help="comma-separated history lengths")
+    parser.add_argument('--appends', type=int, default=4, help="batches replayed per history length")
+    parser.add_argument('--append-days', type=int, default=90)
+    args = parser.parse_args()
+    result = benchmark(tuple(int(y) for y in args.years.split(',')), args.appends, args.append_days)
+    print(result.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from datetime import datetime
+
+import water_data
+from hierarchy import SAURASHTRA
+
+# -----------------------------------------------------------------------------
+# RESAMPLING ENGINE (sub-daily telemetry -> daily / weekly / monthly views)
+# -----------------------------------------------------------------------------
+# Rows are kept sorted by unit then time, so every output bucket is one contiguous
+# run of input rows. Bucket boundaries are found with a single vectorised compare,
+# and each reduction is one ufunc.reduceat over all units and buckets at once.
+
+# column -> reductions; the first keeps the column name, the rest add a suffix
+# (e.g. Reservoir_Level_pct_min). Depth below ground is worst at its max.
+TELEMETRY_AGGS = {
+    'Rainfall_mm': ['sum'],
+    'Temperature_C': ['mean'],
+    'Groundwater_Level_mbgl': ['mean', 'max'],
+    'Reservoir_Level_pct': ['mean', 'min'],
+    'Water_Demand_MLD': ['mean'],
+    'extraction_borewells': ['last'],
+    'recharge_borewells': ['last'],
+}
+
+# Resampling rule -> pandas period alias of the bucket
+RULES = {'h': 'h', 'D': 'D', 'W': 'W', 'M': 'M', 'Q': 'Q'}
+
+
+def _reduce(values, starts, counts, how):
+    if how == 'sum':
+        return np.add.reduceat(values, starts)
+    if how == 'mean':
+        return np.add.reduceat(values.astype(float), starts) / counts
+    if how == 'min':
+        return np.minimum.reduceat(values, starts)
+    if how == 'max':
+        return np.maximum.reduceat(values, starts)
+    if how == 'first':
+        return values[starts]
+    if how == 'last':
+        return values[starts + counts - 1]
+    raise ValueError(f"Unknown reduction: {how}")
+
+
+def resample(df, rule='D', unit_col='District', aggs=TELEMETRY_AGGS):
+    """
+    Buckets each unit's observations by `rule` ('h', 'D', 'W', 'M', 'Q') and reduces
+    every column in `aggs`. Returns one row per (unit, bucket) with 'Date' at the
+    bucket start, in the input's unit order.
+    """
+    unit_codes, _ = pd.factorize(df[unit_col], sort=False)
+    times = df['Date'].to_numpy()
+    if len(df) > 1 and ((np.diff(unit_codes) < 0).any() or
+                        ((np.diff(unit_codes) == 0) & (np.diff(times) < np.timedelta64(0))).any()):
+        order = np.lexsort((times, unit_codes))
+        df, unit_codes = df.iloc[order], unit_codes[order]
+
+    buckets = df['Date'].dt.to_period(RULES[rule]).dt.start_time.to_numpy()
+    boundary = np.ones(len(df), dtype=bool)
+    boundary[1:] = (unit_codes[1:] != unit_codes[:-1]) | (buckets[1:] != buckets[:-1])
+    starts = np.flatnonzero(boundary)
+    counts = np.diff(np.append(starts, len(df)))
+
+    out = {'Date': buckets[starts], unit_col: df[unit_col].to_numpy()[starts]}
+    for col, hows in aggs.items():
+        if col not in df:
+            continue
+        values = df[col].to_numpy()
+        for i, how in enumerate(hows):
+            out[col if i == 0 else f'{col}_{how}'] = _reduce(values, starts, counts, how)
+    return pd.DataFrame(out)
+
+
+def ingest_telemetry(path, hierarchy=SAURASHTRA, start_date=datetime(2020, 1, 1), end_date=datetime(2025, 12, 31), freq='h',
+                     validator=None):
+    """
+    Streams native-resolution telemetry one quarter at a time into a Parquet store at
+    `path` (one row group per district and quarter, so time/district filters prune
+    well) and returns the daily view used by the models. Only one quarter of
+    sub-daily rows is ever held in memory. With a validation.DataValidator, each
+    quarter passes its quality gates first and only clean rows are stored.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    daily = []
+    for raw in water_data.iter_raw_partitions(hierarchy, start_date, end_date):
+        # Each partition is whole days, so daily buckets never straddle two partitions
+        telemetry = water_data.disaggregate_daily(raw, freq)
+        if validator is not None:
+            telemetry = validator.validate(telemetry).clean
+        table = pa.Table.from_pandas(telemetry, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(tmp_path, table.schema)
+        # Partitions are district-major: one row group per district (the longest run)
+        writer.write_table(table, row_group_size=int(telemetry['District'].value_counts().max()))
+        daily.append(resample(telemetry, 'D'))
+    if writer is not None:
+        writer.close()
+        # Swap in atomically so concurrent readers never see a half-written store
+        os.replace(tmp_path, path)
+
+    daily = pd.concat(daily, ignore_index=True)
+    # Back to the in-memory layout: hierarchy district order, then date
+    unit_order = pd.Categorical(daily['District'], categories=hierarchy.names('district')).codes
+    return daily.iloc[np.lexsort((daily['Date'].to_numpy(), unit_order))].reset_index(drop=True)
+
+
+def read_window(path, district, start, end, columns=None, rule=None):
+    """Loads one district's telemetry in [start, end) without touching the rest of the store; optionally resampled."""
+    df = pd.read_parquet(path, columns=columns, filters=[
+        ('District', '==', district), ('Date', '>=', pd.Timestamp(start)), ('Date', '<', pd.Timestamp(end)),
+    ])
+    return resample(df, rule) if rule else df
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# ROLLING STATISTICS ENGINE (many windows and statistics, all units, one pass)
+# -----------------------------------------------------------------------------
+# Rows are brought into (unit, time) order once, so every unit is a contiguous
+# slice of one array. Then:
+#   * sum / mean / std come from a single cumulative sum (and sum of squares) per
+#     column - each window is just the difference of two prefix sums;
+#   * min / max use the van Herk / Gil-Werman block scan: prefix and suffix running
+#     extremes over blocks of `window` rows, combined pairwise. This is the array
+#     form of the monotonic-deque sliding minimum, O(n) per window with no loop over
+#     rows or units;
+#   * lags are a shift with the unit boundaries masked.
+# Prefix-sum differences carry rounding error, so a window whose values are all
+# equal (found exactly from a prefix count of value changes) gets its mean and
+# sum from the value itself and a std of exactly 0.
+# A window that would reach into the previous unit is NaN (pandas min_periods =
+# window), and so is any window containing a NaN.
+
+STATS = ('sum', 'mean', 'std', 'min', 'max')
+
+
+def unit_positions(units):
+    """Index of every row within its unit's run (rows grouped by unit)."""
+    units = np.asarray(units)
+    first = np.ones(len(units), dtype=bool)
+    first[1:] = units[1:] != units[:-1]
+    starts = np.flatnonzero(first)
+    return np.arange(len(units)) - np.repeat(starts, np.diff(np.append(starts, len(units))))
+
+
+def _window_diff(cum, window):
+    """cum[i] - cum[i - window] along axis 0 (prefix sums with a leading zero row)."""
+    out = np.full((len(cum) - 1,) + cum.shape[1:], np.nan)
+    out[window - 1:] = cum[window:] - cum[:-window]
+    return out
+
+
+def _sliding_extreme(x, window, reduce, fill):
+    """Extreme of x[i - window + 1 .. i] along axis 0 for every i >= window - 1."""
+    n = len(x)
+    if n < window:
+        return np.full(x.shape, np.nan)
+    pad = -n % window
+    blocks = np.concatenate([x, np.full((pad,) + x.shape[1:], fill)]).reshape((-1, window) + x.shape[1:])
+    prefix = reduce.accumulate(blocks, axis=1).reshape((-1,) + x.shape[1:])[:n]
+    suffix = reduce.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape((-1,) + x.shape[1:])[:n]
+    out = np.full(x.shape, np.nan)
+    out[window - 1:] = reduce(suffix[:n - window + 1], prefix[window - 1:])
+    return out
+
+
+def rolling_stats(values, position, windows, stats=STATS):
+    """
+    Rolling statistics of `values` (n_rows, n_cols), rows grouped by unit in time
+    order, with `position` from unit_positions. Returns {(window, stat): array}.
+    Prefix sums are built once and shared by every window.
+    """
+    values = np.asarray(values, dtype=float)
+    nan = np.isnan(values)
+    clean = np.where(nan, 0.0, values)
+    # Centering first keeps the sum-of-squares variance accurate
+    center = clean.mean(axis=0) if len(clean) else 0.0
+    shifted = np.where(nan, 0.0, clean - center)
+    zero = np.zeros((1,) + values.shape[1:])
+    cum = np.concatenate([zero, np.cumsum(shifted, axis=0)])
+    cum_sq = np.concatenate([zero, np.cumsum(shifted * shifted, axis=0)]) if 'std' in stats else None
+    cum_nan = np.concatenate([zero, np.cumsum(nan, axis=0)])
+    changed = np.ones(values.shape, dtype=bool)
+    changed[1:] = values[1:] != values[:-1]
+    cum_changed = np.concatenate([zero, np.cumsum(changed, axis=0)])
+
+    results = {}
+    for window in windows:
+        invalid = (position < window - 1)[:, None] | (_window_diff(cum_nan, window) != 0)
+        total = _window_diff(cum, window)
+        mean = total / window
+        # No change among the window's last window - 1 rows: every value is equal
+        constant = np.ones(values.shape, dtype=bool) if window < 2 else _window_diff(cum_changed, window - 1) == 0
+        for stat in stats:
+            if stat == 'sum':
+                out = np.where(constant, values * window, total + center * window)
+            elif stat == 'mean':
+                out = np.where(constant, values, mean + center)
+            elif stat == 'std':
+                # Sample standard deviation (ddof=1), as pandas; undefined for one row
+                if window < 2:
+                    out = np.full(values.shape, np.nan)
+                else:
+                    var = (_window_diff(cum_sq, window) - window * mean * mean) / (window - 1)
+                    out = np.where(constant, 0.0, np.sqrt(np.maximum(var, 0)))
+            elif stat == 'min':
+                out = _sliding_extreme(np.where(nan, np.inf, values), window, np.minimum, np.inf)
+            elif stat == 'max':
+                out = _sliding_extreme(np.where(nan, -np.inf, values), window, np.maximum, -np.inf)
+            else:
+                raise ValueError(f"Unknown rolling statistic: {stat}")
+            out[invalid] = np.nan
+            results[(window, stat)] = out
+    return results
+
+
+def lag(values, position, periods):
+    """values shifted down `periods` rows within each unit (NaN where the unit has no history)."""
+    values = np.asarray(values, dtype=float)
+    out = np.full(values.shape, np.nan)
+    out[periods:] = values[:len(values) - periods]
+    out[position < periods] = np.nan
+    return out
+
+
+def window_features(df, specs, unit_col='District'):
+    """
+    Computes named window features for every unit in one pass.
+
+    specs maps output name -> (column, window, stat), with stat one of STATS or
+    'lag' (window = periods). unit_col is a column or a list of columns. Rows must
+    be in time order within each unit; units need not be contiguous. Returns a
+    DataFrame aligned with df.
+    """
+    codes = df.groupby(unit_col, sort=False).ngroup().to_numpy()
+    # Units listed contiguously (the usual layout) need no reordering
+    order = None if (np.diff(codes) >= 0).all() else np.argsort(codes, kind='stable')
+    codes = codes if order is None else codes[order]
+    position = unit_positions(codes)
+
+    columns = list(dict.fromkeys(column for column, _, _ in specs.values()))
+    values = df[columns].to_numpy(dtype=float)
+    values = values if order is None else values[order]
+
+    windowed = [(w, s) for _, w, s in specs.values() if s != 'lag']
+    stats = [s for s in STATS if any(stat == s for _, stat in windowed)]
+    computed = rolling_stats(values, position, sorted({w for w, _ in windowed}), stats)
+
+    out = {}
+    for name, (column, window, stat) in specs.items():
+        k = columns.index(column)
+        out[name] = lag(values[:, k], position, window) if stat == 'lag' else computed[(window, stat)][:, k]
+    frame = pd.DataFrame(out)
+    if order is not None:
+        frame.index = order
+        frame = frame.sort_index()
+    frame.index = df.index
+    return frame
@@ -0,0 +1,192 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import water_data
+import water_balance
+from hierarchy import SAURASHTRA
+
+# -----------------------------------------------------------------------------
+# CLIMATE-SCENARIO ENSEMBLES (drought stress testing)
+# -----------------------------------------------------------------------------
+# Each ensemble member is one realisation of the raw daily variables under a
+# climate profile. Members get their own child of a single SeedSequence, so an
+# ensemble is reproducible from (profile, seed, n_members) no matter how many
+# processes generated it or in which order. Members are stacked into
+# (n_members, n_districts, n_days) arrays, which the models score in one batch.
+
+
+class ClimateProfile:
+    """Parameters of a climate scenario."""
+
+    def __init__(self, name, monsoon_failure_prob=0.0, failed_monsoon_factor=0.35,
+                 temp_anomaly_c=0.0, extraction_growth=0.0):
+        self.name = name
+        # Chance that a year's monsoon fails region-wide, and the rainfall it then delivers
+        self.monsoon_failure_prob = monsoon_failure_prob
+        self.failed_monsoon_factor = failed_monsoon_factor
+        # Warming added to every day (C)
+        self.temp_anomaly_c = temp_anomaly_c
+        # Compound annual growth of extraction borewells
+        self.extraction_growth = extraction_growth
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+PROFILES = {
+    'baseline': ClimateProfile('baseline'),
+    'failed_monsoon': ClimateProfile('failed_monsoon', monsoon_failure_prob=0.6, temp_anomaly_c=0.5),
+    'multi_year_drought': ClimateProfile('multi_year_drought', monsoon_failure_prob=0.8, failed_monsoon_factor=0.25,
+                                         temp_anomaly_c=1.5, extraction_growth=0.05),
+    'hot_growth': ClimateProfile('hot_growth', monsoon_failure_prob=0.2, temp_anomaly_c=2.0, extraction_growth=0.08),
+}
+
+RAW_VARIABLES = ['Rainfall_mm', 'Temperature_C', 'Groundwater_Level_mbgl', 'Reservoir_Level_pct',
+                 'Water_Demand_MLD', 'extraction_borewells', 'recharge_borewells']
+
+
+def member_drivers(profile, seed_seq, dates, districts):
+    """One ensemble member's drivers and gauge noise (water_data.draw_drivers) from its own seed stream."""
+    rng = np.random.default_rng(seed_seq)
+    years = dates.year.to_numpy()
+    year_index = years - years[0]
+
+    # Region-wide monsoon failure, drawn per year; only the monsoon months are hit
+    failed = rng.random(year_index.max() + 1) < profile.monsoon_failure_prob
+    is_monsoon = (dates.month >= 6) & (dates.month <= 9)
+    rain_factor = np.where(failed[year_index] & is_monsoon, profile.failed_monsoon_factor, 1.0)
+
+    extraction_factor = (1 + profile.extraction_growth) ** year_index
+    return water_data.draw_drivers(dates, districts, rng=rng, rain_factor=rain_factor,
+                                   temp_anomaly=profile.temp_anomaly_c, extraction_factor=extraction_factor)
+
+
+def _generate_batch(profile, seed_seqs, dates, districts):
+    # Draws are per member (own seed stream); the water balance runs once for the
+    # whole (n_members, n_districts, n_days) stack
+    members = [member_drivers(profile, ss, dates, districts) for ss in seed_seqs]
+    drivers = {k: np.stack([np.broadcast_to(m[k], members[0]['rain'].shape) for m in members]) for k in members[0]}
+    balance = water_balance.simulate(drivers['rain'], drivers['temp'], drivers['demand'], drivers['ext_wells'],
+                                     drivers['rech_wells'], districts['base_demand'].to_numpy())
+    return water_data.observe(drivers, balance)
+
+
+class Ensemble:
+    """Stacked ensemble: variables[name] is (n_members, n_districts, n_days)."""
+
+    def __init__(self, profile, seed, dates, districts, variables):
+        self.profile = profile
+        self.seed = seed
+        self.dates = dates
+        self.districts = np.asarray(districts)
+        self.variables = variables
+
+    @property
+    def shape(self):
+        return self.variables['Rainfall_mm'].shape
+
+    def save(self, path):
+        np.savez_compressed(path, dates=self.dates.to_numpy(), districts=self.districts, seed=self.seed,
+                            profile=np.array(list(self.profile.to_dict().items()), dtype=object),
+                            **self.variables)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as data:
+            params = dict(data['profile'])
+            profile = ClimateProfile(**params)
+            variables = {var: data[var] for var in RAW_VARIABLES}
+            return cls(profile, int(data['seed']), pd.DatetimeIndex(data['dates']), data['districts'], variables)
+
+    def to_frame(self):
+        """Long raw frame (Member, District, Date, ...) in member/district/date order."""
+        n_m, n_d, n_t = self.shape
+        return pd.DataFrame({
+            'Member': np.repeat(np.arange(n_m), n_d * n_t),
+            'District': np.tile(np.repeat(self.districts, n_t), n_m),
+            'Date': np.tile(self.dates.to_numpy(), n_m * n_d),
+            **{var: values.ravel() for var, values in self.variables.items()},
+        })
+
+
+def generate_ensemble(profile, n_members, seed=2026, hierarchy=SAURASHTRA,
+                      start_date=datetime(2026, 1, 1), end_date=datetime(2027, 12, 31), max_workers=None):
+    """
+    Generates n_members realisations of `profile` across worker processes.
+    Members are split into one contiguous batch per worker; each member draws from
+    its own spawned seed stream, so results do not depend on max_workers.
+    """
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    districts = hierarchy.table('district')
+    dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    seed_seqs = np.random.SeedSequence(seed).spawn(n_members)
+
+    max_workers = max_workers or min(os.cpu_count() or 1, n_members)
+    batches = [b for b in np.array_split(np.arange(n_members), max_workers) if len(b)]
+    if max_workers == 1:
+        parts = [_generate_batch(profile, seed_seqs, dates, districts)]
+    else:
+        # 'spawn' keeps workers clean when called from threaded hosts such as Streamlit
+        with ProcessPoolExecutor(max_workers=len(batches), mp_context=get_context('spawn')) as pool:
+            parts = list(pool.map(_generate_batch, [profile] * len(batches),
+                                  [[seed_seqs[i] for i in b] for b in batches],
+                                  [dates] * len(batches), [districts] * len(batches)))
+    variables = {var: np.concatenate([p[var] for p in parts]) for var in RAW_VARIABLES}
+    return Ensemble(profile, seed, dates, districts['name'].to_numpy(), variables)
+
+
+def score_ensemble(ensemble, clf, reg, feature_cols):
+    """
+    Engineers features for every member and scores them with the risk and gap models
+    in one batched call each. Returns (n_members, n_districts, n_days) arrays plus
+    the risk class probabilities (..., n_classes) and per-district summaries.
+    """
+    df = ensemble.to_frame()
+    water_data.add_window_features(df, unit_col=['Member', 'District'])
+    water_data.add_derived_features(df)
+    # Same warm-up handling as engineer_features, but never across members/districts
+    df = df.groupby(['Member', 'District'], sort=False).bfill().fillna(0)
+
+    X = df[feature_cols]
+    proba = clf.predict_proba(X)
+    shape = ensemble.shape
+    risk = clf.classes_[proba.argmax(axis=1)].reshape(shape)
+    gap = reg.predict(X).reshape(shape)
+    critical = list(clf.classes_).index(2) if 2 in clf.classes_ else None
+
+    summary = pd.DataFrame({
+        'District': ensemble.districts,
+        # Share of member-days predicted Critical; spread of the members' mean gap
+        'Critical_Day_Share': (risk == 2).mean(axis=(0, 2)),
+        'Mean_Gap_MLD': gap.mean(axis=(0, 2)),
+        'P10_Gap_MLD': np.percentile(gap.mean(axis=2), 10, axis=0),
+        'Worst_Member_Gap_MLD': gap.mean(axis=2).min(axis=0),
+    })
+    return {
+        'risk': risk,
+        'risk_proba': proba.reshape(shape + (len(clf.classes_),)),
+        'critical_proba': proba[:, critical].reshape(shape) if critical is not None else np.zeros(shape),
+        'gap': gap,
+        'summary': summary,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a climate-scenario ensemble.")
+    parser.add_argument('--profile', default='failed_monsoon', choices=list(PROFILES))
+    parser.add_argument('--members', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=2026)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help="default: ensemble_<profile>.npz")
+    args = parser.parse_args()
+
+    ensemble = generate_ensemble(args.profile, args.members, seed=args.seed, max_workers=args.workers)
+    output = args.output or f'ensemble_{args.profile}.npz'
+    ensemble.save(output)
+    print(f"Wrote {ensemble.shape[0]} members x {ensemble.shape[1]} districts x {ensemble.shape[2]} days to {output}")
@@ -0,0 +1,210 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from versioning import data_fingerprint
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, workers may each build once
+    fcntl = None
+
+# -----------------------------------------------------------------------------
+# SHARED-MEMORY DATASET (one copy per host, zero-copy views in every worker)
+# -----------------------------------------------------------------------------
+# The enriched frame is published once as one .npy file per column in a
+# memory-backed directory (/dev/shm where it exists). Every worker process maps
+# the same files read-only, so the pages are shared through the page cache
+# instead of each process holding a private copy, and handing the frame to a
+# session copies nothing. Text columns are stored as codes plus their distinct
+# values; on attach they are decoded to ordinary object columns (an array of
+# references to the few distinct strings), so every column keeps its original
+# dtype and pandas behaves exactly as with the private frame.
+#
+# Layout under <base directory>/<name>/:
+#   <version>/c<i>.npy     one file per column
+#   <version>/columns.json column names, files and text values
+#   <version>/<key>.parquet small companion frames published with the dataset
+#                          (e.g. an ingest report), so they always match it
+#   current.json           pointer to the current version (replaced atomically)
+#   lock                   serialises building, so only one worker builds
+# A republished dataset gets a new version directory; processes that still map the
+# old files keep reading them until they re-attach.
+
+# Where and under which name datasets are published can be overridden with these
+# environment variables (e.g. to keep test runs away from a live deployment)
+BASE_DIR_ENV = 'SHARED_DATA_DIR'
+NAME_ENV = 'SHARED_DATA_NAME'
+DEFAULT_BASE_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def base_dir_or_default(base_dir=None):
+    """base_dir, else $SHARED_DATA_DIR, else DEFAULT_BASE_DIR (read at call time)."""
+    return base_dir or os.environ.get(BASE_DIR_ENV) or DEFAULT_BASE_DIR
+
+
+def configured_name(default):
+    """Dataset name to publish under: $SHARED_DATA_NAME if set, else `default`."""
+    return os.environ.get(NAME_ENV) or default
+
+
+def publish(df, base_dir=None, name='dataset', extras=None):
+    """
+    Writes df as memory-mappable columns and points `name` at it; returns the version.
+    `extras` maps key -> small DataFrame stored alongside (see read_extra).
+    """
+    base_dir = base_dir_or_default(base_dir)
+    version = data_fingerprint(df)
+    root = os.path.join(base_dir, name)
+    os.makedirs(root, exist_ok=True)
+    target = os.path.join(root, version)
+    if not os.path.isdir(target):
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+        columns = []
+        for col in df.columns:
+            series = df[col]
+            entry = {'name': col, 'file': f'c{len(columns)}.npy'}
+            if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+                categorical = pd.Categorical(series)
+                np.save(os.path.join(tmp, entry['file']), categorical.codes)
+                entry['categories'] = [str(c) for c in categorical.categories]
+            else:
+                np.save(os.path.join(tmp, entry['file']), series.to_numpy())
+            columns.append(entry)
+        with open(os.path.join(tmp, 'columns.json'), 'w', encoding='utf-8') as f:
+            json.dump(columns, f)
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            # Another process published the same content first
+            shutil.rmtree(tmp, ignore_errors=True)
+    # Companions go in before the pointer moves (also into an already published copy)
+    for key, frame in (extras or {}).items():
+        path = os.path.join(target, f'{key}.parquet')
+        if not os.path.exists(path):
+            frame.to_parquet(f'{path}.{os.getpid()}.tmp', index=False)
+            os.replace(f'{path}.{os.getpid()}.tmp', path)
+
+    pointer = os.path.join(root, 'current.json')
+    tmp_pointer = f'{pointer}.{os.getpid()}.tmp'
+    with open(tmp_pointer, 'w', encoding='utf-8') as f:
+        json.dump({'version': version, 'published_at': time.time(), 'rows': len(df)}, f)
+    os.replace(tmp_pointer, pointer)
+
+    # Mapped files stay readable after unlinking, so attached readers are unaffected
+    for entry in os.listdir(root):
+        if entry != version and os.path.isdir(os.path.join(root, entry)) and not entry.startswith('.tmp-'):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    return version
+
+
+def current_version(base_dir=None, name='dataset', max_age=None):
+    """Version `name` currently points at (one small file read), or None if nothing fresh enough is published."""
+    base_dir = base_dir_or_default(base_dir)
+    try:
+        with open(os.path.join(base_dir, name, 'current.json'), encoding='utf-8') as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if max_age is not None and time.time() - pointer['published_at'] > max_age:
+        return None
+    return pointer['version']
+
+
+def attach(base_dir=None, name='dataset', max_age=None, version=None):
+    """
+    Read-only DataFrame over the published columns, or None if nothing (fresh
+    enough) is published. With `version`, that version is mapped if it is still on
+    disk, whatever is current. Numeric and date columns are views of the mapped
+    files; writing to them raises. Returns (df, version).
+    """
+    base_dir = base_dir_or_default(base_dir)
+    version = version or current_version(base_dir, name, max_age)
+    if version is None:
+        return None
+    directory = os.path.join(base_dir, name, version)
+    try:
+        with open(os.path.join(directory, 'columns.json'), encoding='utf-8') as f:
+            columns = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    data = {}
+    for entry in columns:
+        # Plain ndarray views of the mapping (np.memmap would leak into pandas)
+        values = np.asarray(np.load(os.path.join(directory, entry['file']), mmap_mode='r'))
+        if 'categories' in entry:
+            # Code -1 (missing) picks the trailing NaN
+            values = np.array(entry['categories'] + [np.nan], dtype=object)[values]
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False), version
+
+
+def read_extra(version, key, base_dir=None, name='dataset'):
+    """Companion frame `key` published with `version`, or None if it has none (or the version is gone)."""
+    path = os.path.join(base_dir_or_default(base_dir), name, version, f'{key}.parquet')
+    try:
+        return pd.read_parquet(path)
+    except OSError:
+        return None
+
+
+def load_or_publish(build, base_dir=None, name='dataset', max_age=None, accept=None):
+    """
+    Attaches to the published dataset; if there is none (or it is older than
+    max_age seconds, or `accept(version)` is false - e.g. a companion file is
+    missing) the first process to get here builds and publishes it while the
+    others wait, then everyone attaches. build() returns the DataFrame, or
+    (DataFrame, extras) to publish companion frames with it. Returns (df, version).
+    """
+    base_dir = base_dir_or_default(base_dir)
+
+    def usable(version):
+        return version is not None and (accept is None or accept(version))
+
+    version = current_version(base_dir, name, max_age)
+    if not usable(version):
+        os.makedirs(os.path.join(base_dir, name), exist_ok=True)
+        with open(os.path.join(base_dir, name, 'lock'), 'w') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Someone else may have published while we waited for the lock
+                version = current_version(base_dir, name, max_age)
+                if not usable(version):
+                    built = build()
+                    df, extras = built if isinstance(built, tuple) else (built, None)
+                    version = publish(df, base_dir, name, extras)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+    return attach(base_dir, name, version=version)
+
+
+def clear(base_dir=None, name='dataset'):
+    """Removes the published dataset (every version and the pointer)."""
+    shutil.rmtree(os.path.join(base_dir_or_default(base_dir), name), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear a published shared dataset.")
+    parser.add_argument('--base-dir', default=base_dir_or_default())
+    parser.add_argument('--name', default=configured_name('saurashtra'))
+    parser.add_argument('--clear', action='store_true')
+    args = parser.parse_args()
+
+    if args.clear:
+        clear(args.base_dir, args.name)
+        print(f"Cleared {args.name} from {args.base_dir}")
+    else:
+        found = attach(args.base_dir, args.name)
+        if found is None:
+            print(f"No dataset named {args.name} in {args.base_dir}")
+        else:
+            df, version = found
+            print(f"{args.name} version {version}: {len(df)} rows x {len(df.columns)} columns")
@@ -0,0 +1,132 @@
+import os
+import threading
+import zlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------------
+# PRECOMPUTED RISK & FORECAST SNAPSHOTS
+# -----------------------------------------------------------------------------
+# After each data or model refresh (new data or model version) one batch job scores
+# every district: latest risk, class probabilities and the 30-day gap projection. The
+# result is a single small .npz (arrays indexed by district) stamped with the
+# data and model versions. Readers look a district up by index; a snapshot whose
+# versions do not match the current ones is stale and callers score live instead.
+
+
+def forecast_gaps(reg, latest_all, feature_cols, data_version, future_days=30):
+    """
+    (n_districts, future_days) gap projection from each district's last known
+    conditions (persistence), with rainfall jittered by a per-district seed so the
+    batch and single-district paths give identical numbers.
+    """
+    n = len(latest_all)
+    X = pd.DataFrame(np.repeat(latest_all[feature_cols].to_numpy(), future_days, axis=0), columns=feature_cols)
+    X = X.astype(latest_all[feature_cols].dtypes.to_dict())
+    X['Rainfall_mm'] = np.concatenate([
+        np.random.default_rng(zlib.crc32(f"{district}:{data_version}".encode())).gamma(1, 2, future_days)
+        for district in latest_all['District']
+    ])
+    return reg.predict(X).reshape(n, future_days)
+
+
+def build_snapshot(clf, reg, latest_all, feature_cols, data_version, model_version, future_days=30):
+    """Scores every district in one batch per model; returns the snapshot arrays."""
+    proba = clf.predict_proba(latest_all[feature_cols])
+    return {
+        'districts': latest_all['District'].to_numpy(dtype=str),
+        'data_date': latest_all['Date'].to_numpy(dtype='datetime64[D]'),
+        'classes': clf.classes_,
+        'risk': clf.classes_[proba.argmax(axis=1)],
+        'proba': proba.astype(np.float32),
+        'gap': forecast_gaps(reg, latest_all, feature_cols, data_version, future_days).astype(np.float32),
+        'data_version': np.array(data_version),
+        'model_version': np.array(model_version),
+    }
+
+
+def save_snapshot(path, snapshot):
+    """Writes a snapshot atomically, so readers never see a partial file."""
+    tmp_path = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(tmp_path, **snapshot)
+    os.replace(tmp_path, path)
+
+
+class SnapshotStore:
+    """Reads the snapshot file (reloading when it changes) and refreshes it in the background."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # (mtime, arrays, index), replaced as a whole, so a reader never mixes two snapshots
+        self._loaded = (None, None, {})
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending = None
+
+    def _load(self):
+        """(arrays, index) of the current file, or (None, {})."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return None, {}
+        with self._lock:
+            if mtime != self._loaded[0]:
+                with np.load(self.path) as data:
+                    arrays = {key: data[key] for key in data.files}
+                self._loaded = (mtime, arrays, {name: i for i, name in enumerate(arrays['districts'])})
+            return self._loaded[1:]
+
+    def _fresh(self, data_version, model_version):
+        """(arrays, index) if the snapshot matches the versions, else (None, {})."""
+        arrays, index = self._load()
+        if (arrays is not None and str(arrays['data_version']) == data_version
+                and str(arrays['model_version']) == model_version):
+            return arrays, index
+        return None, {}
+
+    def is_fresh(self, data_version, model_version):
+        return self._fresh(data_version, model_version)[0] is not None
+
+    def lookup(self, district, data_version, model_version):
+        """Precomputed values for one district, or None if the snapshot is missing or stale."""
+        arrays, index = self._fresh(data_version, model_version)
+        if district not in index:
+            return None
+        i = index[district]
+        start = pd.Timestamp(arrays['data_date'][i])
+        horizon = arrays['gap'].shape[1]
+        return {
+            'risk': int(arrays['risk'][i]),
+            'proba': dict(zip(arrays['classes'].tolist(), arrays['proba'][i].astype(float))),
+            'forecast': pd.DataFrame({
+                'Date': pd.date_range(start + pd.Timedelta(days=1), periods=horizon, freq='D'),
+                'Predicted_Gap_MLD': arrays['gap'][i].astype(float),
+            }),
+        }
+
+    def mean_forecast_gap(self, data_version, model_version):
+        """District -> mean projected gap over the horizon, or None if stale."""
+        arrays = self._fresh(data_version, model_version)[0]
+        if arrays is None:
+            return None
+        return pd.Series(arrays['gap'].mean(axis=1), index=arrays['districts'])
+
+    def gap_projection(self, data_version, model_version):
+        """(districts, data dates, (n_districts, horizon) gaps), or None if stale."""
+        arrays = self._fresh(data_version, model_version)[0]
+        if arrays is None:
+            return None
+        return arrays['districts'], arrays['data_date'], arrays['gap'].astype(float)
+
+    def refresh(self, data_version, model_version, build):
+        """Schedules build() -> snapshot in the background unless fresh or already building this version."""
+        key = (data_version, model_version)
+        if self.is_fresh(data_version, model_version):
+            return None
+        with self._lock:
+            if self._pending is not None and self._pending[0] == key and not self._pending[1].done():
+                return self._pending[1]
+            future = self._executor.submit(lambda: save_snapshot(self.path, build()))
+            self._pending = (key, future)
+        return future
@@ -0,0 +1,78 @@
+import io
+import base64
+import numpy as np
+from scipy.spatial import cKDTree
+from matplotlib import colormaps
+from matplotlib.image import imsave
+
+# -----------------------------------------------------------------------------
+# SPATIAL INTERPOLATION (IDW heatmaps over a regional grid)
+# -----------------------------------------------------------------------------
+# Point observations (villages, wells) are projected to a local kilometre plane,
+# indexed once with a KD-tree, and every grid cell is interpolated in a single
+# batched k-nearest-neighbour query - no loop over cells or points.
+
+KM_PER_DEG_LAT = 110.57
+KM_PER_DEG_LON = 111.32
+
+
+def _to_km(lat, lon, lat0):
+    """Equirectangular projection around lat0 - accurate enough at regional scale."""
+    return np.column_stack([
+        np.asarray(lon) * KM_PER_DEG_LON * np.cos(np.radians(lat0)),
+        np.asarray(lat) * KM_PER_DEG_LAT,
+    ])
+
+
+def regional_grid(lat, lon, resolution=0.02, pad=0.15):
+    """Regular lat/lon axes covering the points' bounding box plus a margin (degrees)."""
+    grid_lat = np.arange(np.min(lat) - pad, np.max(lat) + pad + resolution, resolution)
+    grid_lon = np.arange(np.min(lon) - pad, np.max(lon) + pad + resolution, resolution)
+    return grid_lat, grid_lon
+
+
+def idw_interpolate(lat, lon, values, grid_lat, grid_lon, k=12, power=2, max_distance_km=25):
+    """
+    Inverse-distance-weighted interpolation of point values onto a lat/lon grid.
+
+    values: (n_points,) or (n_points, n_vars). Returns (n_lat, n_lon) or
+    (n_lat, n_lon, n_vars). Cells with no point within max_distance_km are NaN,
+    which keeps the surface from bleeding into the sea.
+    """
+    values = np.asarray(values, dtype=float)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+
+    lat0 = float(np.mean(lat))
+    tree = cKDTree(_to_km(lat, lon, lat0))
+
+    mesh_lat, mesh_lon = np.meshgrid(grid_lat, grid_lon, indexing='ij')
+    cells = _to_km(mesh_lat.ravel(), mesh_lon.ravel(), lat0)
+
+    k = min(k, len(values))
+    dist, idx = tree.query(cells, k=k, distance_upper_bound=max_distance_km)
+    dist, idx = dist.reshape(len(cells), k), idx.reshape(len(cells), k)
+
+    # Missing neighbours come back as dist=inf / idx=n_points; they get zero weight
+    valid = np.isfinite(dist)
+    idx = np.where(valid, idx, 0)
+    weights = np.where(valid, 1.0 / np.maximum(dist, 1e-6) ** power, 0.0)
+    total = weights.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        surface = np.einsum('ck,ckv->cv', weights, values[idx]) / total[:, None]
+    surface[total == 0] = np.nan
+
+    surface = surface.reshape(len(grid_lat), len(grid_lon), -1)
+    return surface[..., 0] if squeeze else surface
+
+
+def surface_to_png(surface, cmap='RdYlGn_r', vmin=None, vmax=None):
+    """Renders a (n_lat, n_lon) surface as a base64 PNG data URI (NaN -> transparent)."""
+    colormap = colormaps[cmap].copy()
+    colormap.set_bad(alpha=0.0)
+    buf = io.BytesIO()
+    # Row 0 of the grid is the southern edge; images are drawn top row first
+    imsave(buf, np.ma.masked_invalid(surface[::-1]), cmap=colormap, vmin=vmin, vmax=vmax, format='png')
+    return 'data:image/png;base64,' + base64.b64encode(buf.getvalue()).decode()
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from alerts import FORECAST_RULES, AlertEngine, forecast_deficit_days, forecast_rows
+
+
+def test_forecast_deficit_days_is_the_longest_negative_run():
+    gaps = np.array([
+        [1, -1, -1, 2, -1, -1, -1],
+        [-1, -1, -1, -1, -1, -1, -1],
+        [1, 1, 1, 1, 1, 1, 1],
+    ], dtype=float)
+    assert forecast_deficit_days(gaps).tolist() == [3, 7, 0]
+
+
+def test_forecast_alert_fires_once_per_deficit_spell():
+    engine = AlertEngine(FORECAST_RULES, cooldown_days=0)
+    deficit, surplus = np.full((1, 30), -2.0), np.full((1, 30), 2.0)
+
+    def snapshot(date, gaps):
+        return engine.process(forecast_rows(['Rajkot'], [np.datetime64(date, 'D')], gaps))
+
+    alerts = snapshot('2025-01-01', deficit)
+    assert [(a['rule'], a['value']) for a in alerts] == [('forecast_deficit_streak', 30.0)]
+    # Still in deficit on the next snapshot: no repeat until the forecast recovers
+    assert snapshot('2025-01-02', deficit) == []
+    assert snapshot('2025-01-03', surplus) == []
+    assert [a['date'] for a in snapshot('2025-01-04', deficit)] == ['2025-01-04']
+    assert engine.state['Rajkot']['last_date'] == pd.Timestamp('2025-01-04')
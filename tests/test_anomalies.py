@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+import water_data
+from anomalies import AnomalyDetector
+
+
+def _raw(end='2021-06-30'):
+    np.random.seed(11)
+    return water_data.generate_raw_data(start_date=pd.Timestamp('2020-01-01'), end_date=pd.Timestamp(end))
+
+
+def _key(scores):
+    return scores.sort_values(['District', 'Date'], ignore_index=True)
+
+
+def test_one_batch_scores_like_appends():
+    raw = _raw()
+    single = AnomalyDetector().process(raw)
+    detector = AnomalyDetector()
+    appended = pd.concat([detector.process(part) for _, part in raw.groupby(raw['Date'].dt.to_period('M'))],
+                         ignore_index=True)
+    pd.testing.assert_frame_equal(_key(single), _key(appended), check_exact=False, rtol=1e-9)
+
+
+def test_daily_appends_match_one_batch():
+    raw = _raw('2020-04-30')
+    detector = AnomalyDetector()
+    daily = pd.concat([detector.process(part) for _, part in raw.groupby('Date')], ignore_index=True)
+    pd.testing.assert_frame_equal(_key(AnomalyDetector().process(raw)), _key(daily), check_exact=False, rtol=1e-9)
+
+
+def test_no_look_ahead():
+    # Scores of the first months do not change when later data is in the same batch
+    raw = _raw()
+    early = raw[raw['Date'] < '2020-07-01']
+    full = AnomalyDetector().process(raw)
+    pd.testing.assert_frame_equal(_key(AnomalyDetector().process(early)),
+                                  _key(full[full['Date'] < '2020-07-01']), check_exact=False, rtol=1e-9)
@@ -0,0 +1,57 @@
+import os
+import shutil
+import uuid
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import shared_data
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def _login():
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.session_state['logged_in'] = True
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_republished_data_refreshes_the_session_models(tmp_path, monkeypatch):
+    # A private store, name and data directory: never the live deployment's
+    name = f'test-{uuid.uuid4().hex[:8]}'
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    monkeypatch.setenv(shared_data.BASE_DIR_ENV, str(tmp_path / 'shared'))
+    monkeypatch.setenv(shared_data.NAME_ENV, name)
+    monkeypatch.setenv('SAURASHTRA_DATA_DIR', str(data_dir))
+
+    def telemetry(version):
+        return data_dir / f'{name}_telemetry-{version}.parquet'
+
+    _login()  # builds and publishes the dataset (with its telemetry and quality report)
+    full, version = shared_data.attach(name=name)
+    full = full.copy()
+    quality = shared_data.read_extra(version, 'quality', name=name)
+
+    # Start a session on a dataset that stops 90 days earlier
+    older = full[full['Date'] <= full['Date'].max() - pd.Timedelta(days=90)].reset_index(drop=True)
+    older_version = shared_data.publish(older, name=name, extras={'quality': quality})
+    shutil.copyfile(telemetry(version), telemetry(older_version))
+
+    at = _login()
+    assert at.session_state['trained_until'] == older['Date'].max()
+    clf, model_version = at.session_state['clf'], at.session_state['model_version']
+
+    # Another process publishes the full history: the next rerun refreshes instead of retraining
+    assert shared_data.publish(full, name=name, extras={'quality': quality}) == version
+    at.run()
+    assert not at.exception
+    assert [toast.value for toast in at.toast] == ['🔄 Models refreshed with the latest data']
+    assert at.session_state['model_data_version'] == version
+    assert at.session_state['trained_until'] == full['Date'].max()
+    assert at.session_state['model_version'] != model_version
+    assert at.session_state['clf'] is not clf and len(clf.estimators_) == 100
+    # Nothing was written outside the private directories
+    assert not os.path.exists(os.path.join(shared_data.DEFAULT_BASE_DIR, name))
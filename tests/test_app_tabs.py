@@ -0,0 +1,26 @@
+import os
+import uuid
+
+from streamlit.testing.v1 import AppTest
+
+import shared_data
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+def test_language_switch_keeps_the_open_tab(tmp_path, monkeypatch):
+    monkeypatch.setenv(shared_data.BASE_DIR_ENV, str(tmp_path / 'shared'))
+    monkeypatch.setenv(shared_data.NAME_ENV, f'test-{uuid.uuid4().hex[:8]}')
+    monkeypatch.setenv('SAURASHTRA_DATA_DIR', str(tmp_path))
+
+    at = AppTest.from_file(APP, default_timeout=600)
+    at.session_state['logged_in'] = True
+    at.run()
+    at.session_state['active_tab'] = '🔮 Forecast & Planning'
+    at.run()
+    assert not at.exception
+
+    at.sidebar.radio[0].set_value('Gujarati').run()
+    assert not at.exception
+    assert at.session_state['active_tab'] == '🔮 આગાહી અને આયોજન'
+    assert at.session_state['active_tab_index'] == 1
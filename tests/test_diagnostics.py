@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from diagnostics import DiagnosticsRunner
+
+
+def _models():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({'a': rng.normal(size=60), 'b': rng.normal(size=60)})
+    y_risk = (X['a'] > 0).astype(int)
+    y_gap = X['a'] * 2 + X['b']
+    clf = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y_risk)
+    reg = RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y_gap)
+    return clf, reg, X, y_risk, y_gap
+
+
+def _wait(job):
+    job.future.exception()
+    while not job.done:
+        time.sleep(0.01)
+
+
+def test_keeps_only_the_latest_versions():
+    clf, reg, X, y_risk, y_gap = _models()
+    runner = DiagnosticsRunner(max_workers=1, max_versions=2)
+    for version in ['v1', 'v2', 'v3']:
+        _wait(runner.submit(version, clf, reg, X, y_risk, y_gap, grid_resolution=5))
+    assert runner.get('v1') is None
+    assert runner.get('v2').result is not None and runner.get('v3').result is not None
+
+
+def test_failed_job_is_retried():
+    clf, reg, X, y_risk, y_gap = _models()
+    runner = DiagnosticsRunner(max_workers=1)
+    failed = runner.submit('v1', clf, reg, X, y_risk.iloc[:10], y_gap, grid_resolution=5)
+    _wait(failed)
+    assert runner.get('v1') is failed and failed.error is not None
+    assert runner.get('v1') is None
+    retried = runner.submit('v1', clf, reg, X, y_risk, y_gap, grid_resolution=5)
+    _wait(retried)
+    assert retried is not failed and retried.error is None and retried.result is not None
@@ -0,0 +1,23 @@
+import os
+
+import export_data
+
+
+def test_unchanged_inputs_skip_regeneration(tmp_path):
+    out = str(tmp_path)
+    version = export_data.input_fingerprint(seed=7)
+    assert version == export_data.input_fingerprint(seed=7) != export_data.input_fingerprint(seed=8)
+    assert export_data.input_fingerprint(seed=None) is None
+    assert not export_data.is_current(out, version)
+
+    df = export_data.generate_synthetic_data(seed=7)
+    written, skipped, removed = export_data.export_partitioned(df, out, input_version=version)
+    assert len(written) == 48 and skipped == removed == []
+    assert export_data.is_current(out, version)
+    assert not export_data.is_current(out, export_data.input_fingerprint(seed=8))
+
+    # A missing file makes the export stale; regenerating rewrites only that partition
+    os.remove(os.path.join(out, 'district=Morbi', 'year=2021', 'part.csv'))
+    assert not export_data.is_current(out, version)
+    written, skipped, removed = export_data.export_partitioned(df, out, input_version=version)
+    assert written == ['district=Morbi/year=2021'] and len(skipped) == 47
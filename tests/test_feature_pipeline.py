@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+import water_data
+from feature_pipeline import run_pipeline, read_features
+from validation import DataValidator
+
+
+def _well_chunks(tmp_path):
+    np.random.seed(3)
+    raw = water_data.generate_raw_data(start_date=pd.Timestamp('2020-01-01'), end_date=pd.Timestamp('2020-06-30'))
+    raw = raw.rename(columns={'District': 'Well'})
+    raw['Well'] = 'W-' + raw['Well']
+    path = tmp_path / 'wells.csv'
+    raw.to_csv(path, index=False)
+    return raw, pd.read_csv(path, parse_dates=['Date'], chunksize=500)
+
+
+def test_pipeline_with_a_non_district_unit_column(tmp_path):
+    raw, chunks = _well_chunks(tmp_path)
+    validator = DataValidator(unit_col='Well')
+    output = str(tmp_path / 'features.parquet')
+    rows = run_pipeline(chunks, output, 'Well', validator)
+    assert rows == len(raw)
+    assert validator.totals['unknown_unit'].sum() == 0 and validator.totals['quarantined'].sum() == 0
+    assert set(read_features(output)['Well']) == set(raw['Well'])
+
+
+def test_explicit_unit_list_still_checked(tmp_path):
+    raw, chunks = _well_chunks(tmp_path)
+    validator = DataValidator(unit_col='Well', units=['W-Rajkot'])
+    rows = run_pipeline(chunks, str(tmp_path / 'features.parquet'), 'Well', validator)
+    assert rows == (raw['Well'] == 'W-Rajkot').sum()
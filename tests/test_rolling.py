@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import rolling
+
+
+def _expected(df, specs):
+    grouped = df.groupby('District', sort=False)
+    out = {}
+    for name, (column, window, stat) in specs.items():
+        if stat == 'lag':
+            out[name] = grouped[column].shift(window)
+        else:
+            out[name] = getattr(grouped[column].rolling(window), stat)().reset_index(level=0, drop=True)
+    return pd.DataFrame(out)
+
+
+@pytest.mark.parametrize('window', [2, 4, 5, 6, 7, 9, 10, 11])
+def test_units_shorter_than_the_window(window):
+    df = pd.DataFrame({'District': np.repeat(['A', 'B', 'C'], [5, 3, 12]),
+                       'x': np.random.default_rng(window).normal(size=20)})
+    specs = {f'x_{stat}': ('x', window, stat) for stat in rolling.STATS}
+    result = rolling.window_features(df, specs)
+    pd.testing.assert_frame_equal(result, _expected(df, specs), check_exact=False, atol=1e-9)
+
+
+def test_constant_windows_are_exact():
+    x = np.concatenate([np.full(40, 0.0), np.random.default_rng(1).normal(1e3, 50, 60), np.full(40, 7.3)])
+    df = pd.DataFrame({'District': 'A', 'x': x})
+    result = rolling.window_features(df, {'mean': ('x', 10, 'mean'), 'std': ('x', 10, 'std'),
+                                          'sum': ('x', 10, 'sum')})
+    zeros, sevens = slice(9, 40), slice(109, 140)
+    assert (result['std'].iloc[zeros] == 0).all() and (result['std'].iloc[sevens] == 0).all()
+    assert (result['mean'].iloc[zeros] == 0).all() and (result['mean'].iloc[sevens] == 7.3).all()
+    assert (result['sum'].iloc[zeros] == 0).all()
+
+
+def test_matches_pandas_with_gaps_and_unsorted_units():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({'District': np.tile(['A', 'B', 'C'], 100), 'x': rng.gamma(2, 10, 300)})
+    df.loc[rng.choice(300, 15, replace=False), 'x'] = np.nan
+    specs = {f'x_{w}_{stat}': ('x', w, stat) for w in (1, 3, 30) for stat in rolling.STATS}
+    specs['x_lag2'] = ('x', 2, 'lag')
+    pd.testing.assert_frame_equal(rolling.window_features(df, specs), _expected(df, specs),
+                                  check_exact=False, atol=1e-9)
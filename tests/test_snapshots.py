@@ -0,0 +1,63 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from snapshots import SnapshotStore, save_snapshot
+
+
+def _snapshot(version, n=8, horizon=30):
+    # Every value encodes the version, so a lookup mixing two snapshots is detectable
+    return {
+        'districts': np.array([f'D{i}' for i in range(n)]),
+        'data_date': np.full(n, np.datetime64('2025-12-31', 'D')),
+        'classes': np.array([0, 1, 2]),
+        'risk': np.full(n, version % 3),
+        'proba': np.full((n, 3), version, dtype=np.float32),
+        'gap': np.full((n, horizon), version, dtype=np.float32),
+        'data_version': np.array(f'd{version}'),
+        'model_version': np.array('m'),
+    }
+
+
+def test_lookup_never_mixes_snapshots(tmp_path):
+    path = str(tmp_path / 'snapshot.npz')
+    save_snapshot(path, _snapshot(0))
+    store = SnapshotStore(path)
+    stop, errors = threading.Event(), []
+
+    def writer():
+        for version in range(1, 200):
+            save_snapshot(path, _snapshot(version))
+        stop.set()
+
+    def reader():
+        while not stop.is_set():
+            for version in range(200):
+                found = store.lookup('D3', f'd{version}', 'm')
+                if found is not None and not (found['risk'] == version % 3
+                                              and (found['forecast']['Predicted_Gap_MLD'] == version).all()):
+                    errors.append(version)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+
+
+def test_refresh_builds_once_per_version(tmp_path):
+    path = str(tmp_path / 'snapshot.npz')
+    store = SnapshotStore(path)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return _snapshot(1)
+
+    store.refresh('d1', 'm', build).result()
+    assert store.is_fresh('d1', 'm') and store.refresh('d1', 'm', build) is None
+    assert len(calls) == 1
+    assert isinstance(store.mean_forecast_gap('d1', 'm'), pd.Series)
+    assert store.lookup('D0', 'd2', 'm') is None
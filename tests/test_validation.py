@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from validation import DataValidator
+
+
+def _batch(dates, district='Rajkot', rainfall=None):
+    n = len(dates)
+    return pd.DataFrame({
+        'Date': pd.to_datetime(dates), 'District': district,
+        'Rainfall_mm': np.zeros(n) if rainfall is None else rainfall,
+        'Temperature_C': 30.0, 'Groundwater_Level_mbgl': 15.0, 'Reservoir_Level_pct': 40.0,
+        'Water_Demand_MLD': 100.0, 'extraction_borewells': 300, 'recharge_borewells': 40,
+    })
+
+
+def _reasons(result):
+    return dict(zip(result.quarantine['Date'].dt.strftime('%Y-%m-%d'), result.quarantine['quarantine_reason']))
+
+
+def test_bad_future_row_does_not_reject_later_good_rows():
+    # The 2030 row fails the range check, so the rows after it are still in order
+    batch = _batch(['2024-01-01', '2030-01-01', '2024-01-02', '2024-01-03'], rainfall=[0, -5, 0, 0])
+    result = DataValidator().validate(batch)
+    assert _reasons(result) == {'2030-01-01': 'out_of_range'}
+    assert len(result.clean) == 3
+
+
+def test_rows_before_an_accepted_row_are_out_of_order():
+    batch = _batch(['2024-01-01', '2024-01-05', '2024-01-03', '2024-01-04', '2024-01-06'])
+    result = DataValidator().validate(batch)
+    assert _reasons(result) == {'2024-01-03': 'out_of_order', '2024-01-04': 'out_of_order'}
+
+
+def test_order_is_carried_across_batches():
+    validator = DataValidator()
+    validator.validate(_batch(['2024-01-01', '2024-01-02']))
+    result = validator.validate(_batch(['2024-01-02', '2024-01-03']))
+    assert _reasons(result) == {'2024-01-02': 'out_of_order'}
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+import water_balance
+import water_data
+import scenarios
+from hierarchy import SAURASHTRA
+
+
+def _drivers(n_days=730, seed=0):
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D')
+    districts = SAURASHTRA.table('district')
+    return dates, districts, water_data.draw_drivers(dates, districts, rng=np.random.default_rng(seed))
+
+
+def _simulate(drivers, districts, state=None, days=slice(None)):
+    return water_balance.simulate(*(drivers[k][..., days] for k in ('rain', 'temp', 'demand', 'ext_wells', 'rech_wells')),
+                                  districts['base_demand'].to_numpy(), state=state)
+
+
+def test_partitioned_run_equals_single_run():
+    dates, districts, drivers = _drivers()
+    single = _simulate(drivers, districts)
+
+    state, parts = {}, []
+    bounds = [0, 5, 40, 91, 182, 400, 730]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        parts.append(_simulate(drivers, districts, state, slice(lo, hi)))
+    for name, values in single.items():
+        np.testing.assert_allclose(np.concatenate([p[name] for p in parts], axis=-1), values, atol=1e-9)
+
+
+def test_initial_depth_does_not_depend_on_run_length():
+    dates, districts, drivers = _drivers()
+    short = _simulate(drivers, districts, days=slice(0, 90))
+    full = _simulate(drivers, districts)
+    np.testing.assert_allclose(short['Groundwater_Level_mbgl'], full['Groundwater_Level_mbgl'][:, :90])
+
+
+def test_ensemble_simulated_together_matches_members_alone():
+    dates, districts = pd.date_range('2026-01-01', periods=400, freq='D'), SAURASHTRA.table('district')
+    profile = scenarios.PROFILES['multi_year_drought']
+    seed_seqs = np.random.SeedSequence(5).spawn(3)
+    batch = scenarios._generate_batch(profile, seed_seqs, dates, districts)
+    for m, ss in enumerate(seed_seqs):
+        drivers = scenarios.member_drivers(profile, ss, dates, districts)
+        alone = water_data.observe(drivers, _simulate(drivers, districts))
+        for name in scenarios.RAW_VARIABLES:
+            np.testing.assert_allclose(batch[name][m], alone[name])
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+from hierarchy import SAURASHTRA
+
+# -----------------------------------------------------------------------------
+# DATA VALIDATION (quality gates at ingest)
+# -----------------------------------------------------------------------------
+# Every check is a boolean mask over the whole batch, combined into one bit field
+# per row; reason strings are only built for the (few) quarantined rows. The
+# validator remembers each unit's last accepted timestamp, so ordering and gap
+# checks continue across appends without rescanning history.
+
+# column -> (min, max) physically plausible range for raw observations
+RAW_RANGES = {
+    'Rainfall_mm': (0, 500),
+    'Temperature_C': (-5, 55),
+    'Groundwater_Level_mbgl': (0, 200),
+    'Reservoir_Level_pct': (0, 100),
+    'Water_Demand_MLD': (0, 10000),
+    'extraction_borewells': (0, 100000),
+    'recharge_borewells': (0, 100000),
+}
+
+# Row-level failures, in the order they are reported
+CHECKS = ['missing', 'out_of_range', 'unknown_unit', 'duplicate', 'out_of_order']
+
+
+class ValidationResult:
+    """Outcome of validating one batch."""
+
+    def __init__(self, clean, quarantine, report):
+        self.clean = clean
+        self.quarantine = quarantine
+        self.report = report
+
+    @property
+    def passed(self):
+        return self.quarantine.empty
+
+
+class DataValidator:
+    """Schema, range, ordering, duplicate and gap checks per batch, with per-unit state between batches."""
+
+    def __init__(self, ranges=RAW_RANGES, unit_col='District', units=None, freq='D'):
+        self.ranges = ranges
+        self.unit_col = unit_col
+        # Known units: the hierarchy's districts by default; for any other unit column
+        # (e.g. wells from a CSV) there is no list to check against unless one is given
+        if units is None:
+            units = SAURASHTRA.names('district') if unit_col == 'District' else None
+        self.units = None if units is None else set(units)
+        self.step = pd.Timedelta(pd.tseries.frequencies.to_offset(freq))
+        self.last_date = {}
+        self.totals = None
+
+    def validate(self, batch):
+        """Splits a raw batch into clean and quarantined rows and returns a per-unit quality report."""
+        required = ['Date', self.unit_col] + list(self.ranges)
+        missing_cols = [c for c in required if c not in batch]
+        if missing_cols:
+            raise ValueError(f"Schema check failed: missing columns {missing_cols}")
+
+        unit_col = self.unit_col
+        batch = batch.sort_values(unit_col, kind='stable', ignore_index=True)
+        n = len(batch)
+        dates = pd.to_datetime(batch['Date'], errors='coerce')
+        units = batch[unit_col].to_numpy()
+        flags = np.zeros(n, dtype=np.uint8)
+
+        # Schema / completeness: unparseable or empty values become NaN
+        values = batch[list(self.ranges)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        missing = np.isnan(values).any(axis=1) | dates.isna().to_numpy()
+        flags |= missing.astype(np.uint8) << 0
+
+        # Ranges, all columns at once
+        lo = np.array([r[0] for r in self.ranges.values()])
+        hi = np.array([r[1] for r in self.ranges.values()])
+        with np.errstate(invalid='ignore'):
+            out_of_range = ((values < lo) | (values > hi)).any(axis=1)
+        flags |= out_of_range.astype(np.uint8) << 1
+
+        if self.units is not None:
+            flags |= (~pd.Series(units).isin(self.units).to_numpy()).astype(np.uint8) << 2
+
+        # Duplicates of (unit, timestamp) within the batch; the first copy is kept
+        duplicate = pd.DataFrame({'u': units, 'd': dates}).duplicated().to_numpy()
+        flags |= duplicate.astype(np.uint8) << 3
+
+        # Monotonic time per unit: each row must be later than every row accepted before
+        # it, including what earlier batches accepted. Only rows that passed the other
+        # checks count, so one bad row dated in the future cannot reject the good rows
+        # after it. (The accepted rows are exactly the running-maximum records among
+        # those, so the running maximum of their dates is the last accepted date.)
+        carried = self._carried(units).to_numpy()
+        candidate = dates.where(flags == 0)
+        by_unit = candidate.groupby(units, sort=False)
+        prev_max = by_unit.cummax().groupby(units, sort=False).ffill().groupby(units, sort=False).shift(1).to_numpy()
+        prev_max = np.where(np.isnat(prev_max) | (carried > prev_max), carried, prev_max)
+        out_of_order = (dates.to_numpy() <= prev_max) & ~duplicate
+        flags |= out_of_order.astype(np.uint8) << 4
+
+        bad = flags != 0
+        clean = batch[~bad].reset_index(drop=True)
+        quarantine = batch[bad].reset_index(drop=True)
+        reasons = [[name for bit, name in enumerate(CHECKS) if f >> bit & 1] for f in flags[bad]]
+        quarantine['quarantine_reason'] = [', '.join(r) for r in reasons]
+
+        report = self._report(batch, dates, units, flags, bad)
+        self.totals = report if self.totals is None else self._merge(self.totals, report)
+        return ValidationResult(clean, quarantine, report)
+
+    def _carried(self, units):
+        """Last accepted timestamp of each row's unit (NaT for units not seen before)."""
+        last = pd.Series(self.last_date, dtype='datetime64[ns]')
+        return pd.Series(units).map(last)
+
+    def _report(self, batch, dates, units, flags, bad):
+        frame = pd.DataFrame({'unit': units, 'date': dates.to_numpy(), 'bad': bad})
+        for bit, name in enumerate(CHECKS):
+            frame[name] = (flags >> bit & 1).astype(int)
+
+        # Gaps: missing steps between consecutive accepted timestamps (and the previous batch's last)
+        good = frame[~bad]
+        prev = good.groupby('unit', sort=False)['date'].shift(1)
+        prev = prev.fillna(self._carried(good['unit']).set_axis(good.index))
+        gap_steps = ((good['date'] - prev) / self.step - 1).clip(lower=0).fillna(0)
+
+        report = frame.groupby('unit', sort=False).agg(
+            rows=('bad', 'size'), quarantined=('bad', 'sum'),
+            first_date=('date', 'min'), last_date=('date', 'max'),
+            **{name: (name, 'sum') for name in CHECKS},
+        )
+        report['missing_steps'] = gap_steps.groupby(good['unit'], sort=False).sum().reindex(report.index).fillna(0).astype(int)
+        report['passed'] = report['rows'] - report['quarantined']
+        report.index.name = self.unit_col
+
+        # Remember the newest accepted timestamp per unit for the next batch
+        self.last_date.update(good.groupby('unit', sort=False)['date'].max().to_dict())
+        return report.reset_index()
+
+    def _merge(self, totals, report):
+        combined = pd.concat([totals, report], ignore_index=True)
+        counts = ['rows', 'quarantined', 'passed', 'missing_steps'] + CHECKS
+        merged = combined.groupby(self.unit_col, sort=False).agg(
+            first_date=('first_date', 'min'), last_date=('last_date', 'max'),
+            **{c: (c, 'sum') for c in counts},
+        )
+        return merged.reset_index()[list(totals.columns)]
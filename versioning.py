@@ -0,0 +1,28 @@
+import hashlib
+import pandas as pd
+
+# -----------------------------------------------------------------------------
+# DATA & MODEL VERSIONING
+# -----------------------------------------------------------------------------
+# Short content hashes used as cache keys, so cached artefacts (attributions,
+# diagnostics, figures) are invalidated exactly when the data or models change.
+
+def data_fingerprint(df):
+    """Returns a short, stable hash of a DataFrame's contents."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(repr(list(df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def model_fingerprint(*models):
+    """Returns a short, stable hash identifying a set of fitted tree ensembles."""
+    h = hashlib.blake2b(digest_size=8)
+    for model in models:
+        h.update(type(model).__name__.encode())
+        h.update(repr(sorted(model.get_params().items())).encode())
+        for est in model.estimators_:
+            tree = est.tree_
+            h.update(tree.feature.tobytes())
+            h.update(tree.threshold.tobytes())
+    return h.hexdigest()
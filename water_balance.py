@@ -0,0 +1,141 @@
+import numpy as np
+
+# -----------------------------------------------------------------------------
+# WATER-BALANCE SIMULATION (reservoir storage and aquifer head)
+# -----------------------------------------------------------------------------
+# Storage and head are state: each day starts from the previous day's value and
+# adds that day's inflows and outflows. The recurrence runs over days only; every
+# step updates all trajectories at once, so the leading axes can be districts,
+# ensemble members x districts, or anything else that broadcasts.
+#
+# Units: flows are MLD (megalitres/day); 1 mm of rain on 1 km2 is 1 ML.
+
+# GROUNDWATER CONSTANTS (MLD per borewell unit) - same as the feature engineering
+AVG_RECHARGE_RATE = 0.05
+AVG_EXTRACTION_RATE = 0.12
+# Natural recharge per mm of 30-day average rainfall (MLD), as in Natural_Recharge_MLD
+NATURAL_RECHARGE_PER_MM = 1.5
+RECHARGE_WINDOW_DAYS = 30
+# Long-run mean daily rainfall of the synthetic climate (mm): a 70% chance of a
+# gamma(2, 10) day over the 122 monsoon days, 10% of a gamma(1, 2) day otherwise
+CLIMATE_MEAN_RAIN_MM = (122 * 0.7 * 20 + 243 * 0.1 * 2) / 365
+
+# Aquifer: lateral inflow grows as the water table is drawn below its regional
+# equilibrium, which keeps a pumped aquifer at a finite (but deeper) level.
+EQUILIBRIUM_DEPTH_M = 10.0
+LATERAL_INFLOW_MLD_PER_M = 3.75
+# Storage per metre of head (km2 x specific yield); sets a ~6 month response time
+AQUIFER_STORAGE_KM2 = 0.675
+MIN_DEPTH_M = 2.0
+MAX_DEPTH_M = 60.0
+
+# Reservoir: sized and fed in proportion to the district's base demand
+CAPACITY_DAYS_OF_DEMAND = 250
+CATCHMENT_KM2_PER_MLD = 1.0
+RUNOFF_COEFFICIENT = 0.15
+# Surface water covers this share of demand while storage lasts
+SURFACE_SHARE = 0.35
+# Daily evaporation as a fraction of storage at 30 C (scales with temperature)
+EVAPORATION_RATE = 0.002
+
+
+def reservoir_parameters(base_demand):
+    """Capacity (ML) and catchment area (km2) per unit from its base demand (MLD)."""
+    base_demand = np.asarray(base_demand, dtype=float)
+    return base_demand * CAPACITY_DAYS_OF_DEMAND, base_demand * CATCHMENT_KM2_PER_MLD
+
+
+def natural_recharge(rain, history=None):
+    """
+    Natural recharge (MLD) from the trailing 30-day mean rainfall along the last axis.
+    `history` is the rain of the days before `rain` (up to the last 29), so a window
+    that starts in an earlier call is still a full window.
+    """
+    n_t = rain.shape[-1]
+    if history is not None and history.shape[-1]:
+        rain = np.concatenate([np.broadcast_to(history, rain.shape[:-1] + history.shape[-1:]), rain], axis=-1)
+    csum = np.cumsum(rain, axis=-1)
+    window = np.minimum(np.arange(1, rain.shape[-1] + 1), RECHARGE_WINDOW_DAYS)
+    lagged = np.zeros_like(csum)
+    lagged[..., RECHARGE_WINDOW_DAYS:] = csum[..., :-RECHARGE_WINDOW_DAYS]
+    return ((csum - lagged) / window * NATURAL_RECHARGE_PER_MM)[..., rain.shape[-1] - n_t:]
+
+
+def equilibrium_depth(rech_wells, ext_wells, mean_rain=CLIMATE_MEAN_RAIN_MM):
+    """Depth (m) at which lateral inflow balances the long-run net recharge under mean_rain (mm/day)."""
+    net = mean_rain * NATURAL_RECHARGE_PER_MM + rech_wells * AVG_RECHARGE_RATE - ext_wells * AVG_EXTRACTION_RATE
+    return np.clip(EQUILIBRIUM_DEPTH_M - net / LATERAL_INFLOW_MLD_PER_M, MIN_DEPTH_M, MAX_DEPTH_M)
+
+
+def simulate(rain, temp, demand, ext_wells, rech_wells, base_demand, state=None, init_storage_pct=40.0):
+    """
+    Carries reservoir storage and depth to groundwater forward day by day.
+
+    rain, temp, demand, ext_wells and rech_wells are (..., n_days) arrays;
+    base_demand is (...,). The initial depth is each unit's equilibrium under the
+    climate's mean rainfall and its first day's borewells, so there is no spin-up
+    transient and it does not depend on how long the run is. `state` is an optional
+    dict holding 'storage_pct', 'depth_m' and 'rain_tail' (the last 29 days of rain,
+    for the recharge window); if given it seeds the run and is updated with the
+    final values, so consecutive calls give exactly one continuous run.
+    Returns a dict of (..., n_days) arrays.
+    """
+    rain = np.asarray(rain, dtype=float)
+    shape = rain.shape
+    n_t = shape[-1]
+    temp, demand, ext_wells, rech_wells = (np.broadcast_to(np.asarray(a, dtype=float), shape)
+                                           for a in (temp, demand, ext_wells, rech_wells))
+
+    # Everything that does not depend on state is computed for all days up front
+    capacity, catchment = reservoir_parameters(base_demand)
+    capacity = np.broadcast_to(capacity, shape[:-1])
+    inflow = rain * catchment[..., None] * RUNOFF_COEFFICIENT
+    evap_rate = EVAPORATION_RATE * np.clip(temp, 0, None) / 30
+    surface_demand = demand.clip(0) * SURFACE_SHARE
+    state = {} if state is None else state
+    history = state.get('rain_tail')
+    net_gw = (natural_recharge(rain, history)
+              + rech_wells * AVG_RECHARGE_RATE - ext_wells * AVG_EXTRACTION_RATE)
+    storage = capacity * state.get('storage_pct', init_storage_pct) / 100
+    storage = np.broadcast_to(storage, shape[:-1]).copy()
+    if 'depth_m' in state:
+        depth = np.broadcast_to(state['depth_m'], shape[:-1]).copy()
+    else:
+        depth = equilibrium_depth(rech_wells[..., 0], ext_wells[..., 0])
+
+    res_pct = np.empty(shape)
+    release = np.empty(shape)
+    spill = np.empty(shape)
+    gw_depth = np.empty(shape)
+    metres_per_ml = 0.001 / AQUIFER_STORAGE_KM2
+
+    for t in range(n_t):
+        # Reservoir: inflow, then evaporation, then supply; anything above capacity spills
+        storage += inflow[..., t]
+        storage -= storage * evap_rate[..., t]
+        out = np.minimum(storage, surface_demand[..., t])
+        storage -= out
+        over = np.maximum(storage - capacity, 0)
+        storage -= over
+        res_pct[..., t] = storage / capacity * 100
+        release[..., t] = out
+        spill[..., t] = over
+
+        # Aquifer: net recharge plus lateral inflow raise the water table (smaller depth)
+        lateral = (depth - EQUILIBRIUM_DEPTH_M) * LATERAL_INFLOW_MLD_PER_M
+        depth -= (net_gw[..., t] + lateral) * metres_per_ml
+        np.clip(depth, MIN_DEPTH_M, MAX_DEPTH_M, out=depth)
+        gw_depth[..., t] = depth
+
+    state['storage_pct'] = storage / capacity * 100
+    state['depth_m'] = depth
+    if history is not None:
+        rain = np.concatenate([np.broadcast_to(history, shape[:-1] + history.shape[-1:]), rain], axis=-1)
+    state['rain_tail'] = rain[..., -(RECHARGE_WINDOW_DAYS - 1):].copy()
+    return {
+        'Reservoir_Level_pct': res_pct,
+        'Reservoir_Release_MLD': release,
+        'Reservoir_Spill_MLD': spill,
+        'Groundwater_Level_mbgl': gw_depth,
+        'Net_GW_Change_MLD': net_gw,
+    }